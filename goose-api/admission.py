@@ -0,0 +1,190 @@
+"""
+Admission control for expensive endpoints.
+
+Streams hold a tailer subscription for as long as they are open, and command
+sends type into the one shared tmux window. Without limits a single runaway
+client can open hundreds of streams or flood the terminal and slow everyone
+else down. An AdmissionController gives every endpoint class a policy, applied
+separately per client key (the API key and the client using it):
+
+- a token bucket limits how fast new requests are admitted
+- a concurrency limit caps how many run at the same time; requests over the
+  limit wait in a queue for a short while before they are rejected
+
+On top of that, a total concurrency limit per endpoint class caps what all
+clients together may run, so clients that pose as many cannot take over the API.
+
+Rejections carry the number of seconds after which a retry makes sense, which
+the API returns as `429 Too Many Requests` with a `Retry-After` header.
+"""
+import asyncio
+import math
+import time
+from typing import Any, Dict, NamedTuple, Tuple
+
+# Idle limiters are dropped once there are more than this many, so one-off clients do not accumulate
+MAX_IDLE_LIMITERS = 1024
+
+
+class Policy(NamedTuple):
+    concurrency: int  # Requests running at once, 0 is unlimited
+    rate: float  # Requests admitted per second, 0 is unlimited
+    burst: int  # Bucket size, requests that can be admitted at once after a quiet period
+    queue_timeout: float  # Seconds a request waits for a free slot before it is rejected
+    total_concurrency: int = 0  # Requests running at once across all clients, 0 is unlimited
+
+
+class Rejected(Exception):
+    """Raised when a request is not admitted."""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def full(self) -> bool:
+        return self.tokens + (time.monotonic() - self.updated) * self.rate >= self.capacity
+
+    def take(self) -> float:
+        """Take a token. Returns 0 if one was available, otherwise the seconds until there is one."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class _Limiter:
+    """State of one policy for one client key."""
+
+    def __init__(self, policy: Policy):
+        self.bucket = TokenBucket(policy.rate, policy.burst) if policy.rate > 0 else None
+        self.slots = asyncio.Semaphore(policy.concurrency) if policy.concurrency > 0 else None
+        self.active = 0
+        self.queued = 0
+
+    def idle(self) -> bool:
+        """Whether dropping the limiter and creating it again later changes nothing."""
+        return self.active == 0 and self.queued == 0 and (self.bucket is None or self.bucket.full())
+
+
+class Ticket:
+    """An admitted request. Release it when the request is done, releasing twice is harmless."""
+
+    def __init__(self, *limiters: _Limiter):
+        self._limiters = limiters
+        self._released = False
+
+    def release(self):
+        if self._released:
+            return
+        self._released = True
+        for limiter in self._limiters:
+            limiter.active -= 1
+            if limiter.slots is not None:
+                limiter.slots.release()
+
+
+class AdmissionController:
+    """Applies a Policy per endpoint class and client key, and counts what it admits and rejects."""
+
+    def __init__(self, policies: Dict[str, Policy]):
+        self.policies = policies
+        self._limiters: Dict[Tuple[str, str], _Limiter] = {}
+        # Shared by all clients of an endpoint class, only their concurrency limit applies
+        self._totals = {
+            endpoint: _Limiter(Policy(policy.total_concurrency, 0, 0, policy.queue_timeout))
+            for endpoint, policy in policies.items()
+        }
+        self._counters = {
+            endpoint: {"admitted": 0, "queued": 0, "rejected_rate": 0, "rejected_concurrency": 0}
+            for endpoint in policies
+        }
+
+    async def acquire(self, endpoint: str, key: str) -> Ticket:
+        """
+        Admit a request or raise Rejected.
+
+        Args:
+            endpoint: The endpoint class, one of the configured policies
+            key: Identifies the client, limits are applied to each key separately
+        """
+        policy = self.policies[endpoint]
+        limiter = self._limiters.get((endpoint, key))
+        if limiter is None:
+            if len(self._limiters) >= MAX_IDLE_LIMITERS:
+                self._prune()
+            limiter = self._limiters[(endpoint, key)] = _Limiter(policy)
+        counters = self._counters[endpoint]
+
+        if limiter.bucket is not None:
+            wait = limiter.bucket.take()
+            if wait > 0:
+                counters["rejected_rate"] += 1
+                raise Rejected(f"Rate limit for {endpoint} requests exceeded", wait)
+
+        await self._take_slot(endpoint, limiter, policy.queue_timeout, f"Too many concurrent {endpoint} requests")
+        total = self._totals[endpoint]
+        try:
+            await self._take_slot(endpoint, total, policy.queue_timeout, f"The API is at its limit of {endpoint} requests")
+        except BaseException:
+            # Rejected or cancelled while waiting, give the client's slot back
+            Ticket(limiter).release()
+            raise
+
+        counters["admitted"] += 1
+        return Ticket(limiter, total)
+
+    async def _take_slot(self, endpoint: str, limiter: _Limiter, queue_timeout: float, reason: str):
+        """Take a concurrency slot of a limiter, waiting up to queue_timeout for one, and count it as active."""
+        counters = self._counters[endpoint]
+        if limiter.slots is not None:
+            if limiter.slots.locked():
+                if queue_timeout <= 0:
+                    counters["rejected_concurrency"] += 1
+                    raise Rejected(reason, 1)
+                counters["queued"] += 1
+                limiter.queued += 1
+                try:
+                    await asyncio.wait_for(limiter.slots.acquire(), queue_timeout)
+                except asyncio.TimeoutError:
+                    counters["rejected_concurrency"] += 1
+                    raise Rejected(reason, queue_timeout)
+                finally:
+                    limiter.queued -= 1
+            else:
+                await limiter.slots.acquire()
+        limiter.active += 1
+
+    def _prune(self):
+        for limiter_key in [k for k, limiter in self._limiters.items() if limiter.idle()]:
+            del self._limiters[limiter_key]
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for endpoint, policy in self.policies.items():
+            limiters = [l for (e, _), l in self._limiters.items() if e == endpoint]
+            result[endpoint] = {
+                "concurrency_limit": policy.concurrency,
+                "total_concurrency_limit": policy.total_concurrency,
+                "clients": len(limiters),
+                "rate_limit": policy.rate,
+                "active": sum(l.active for l in limiters),
+                "waiting": sum(l.queued for l in limiters) + self._totals[endpoint].queued,
+                **self._counters[endpoint],
+            }
+        return result
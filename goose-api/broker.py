@@ -0,0 +1,226 @@
+"""
+Cross-process event broker for multi-worker deployments.
+
+When the API runs with several uvicorn workers, a single broker process owns
+the TailHub and serves it over a Unix socket. Each worker keeps one connection
+to the broker and subscribes to a session at most once, no matter how many of
+its own clients follow that session, so every log is tailed exactly once for
+the whole deployment.
+
+The protocol is line based, one frame per line with tab separated fields:
+
+    worker -> broker   S <session_id>                    subscribe
+    worker -> broker   U <session_id>                    unsubscribe
+    worker -> broker   W                                 watch the logs directory
+    worker -> broker   V                                 stop watching
+    broker -> worker   O <session_id> <offset>           subscribed, events start at offset
+    broker -> worker   X <session_id> <message>          subscription failed or ended
+    broker -> worker   E <session_id> <offset> <end> <line>   appended log line
+    broker -> worker   C <kind> <session_id> <previous_size> <size>   session created or modified
+
+Log lines are forwarded verbatim, they never contain a newline.
+"""
+import asyncio
+import os
+from typing import Dict, Optional, Set
+
+from tail_hub import CATALOG, CatalogEvent, Subscription, TailEvent, TailHub, parse_line
+
+# Bytes a worker may leave unread before the broker drops its connection
+MAX_CLIENT_BUFFER = 64 * 1024 * 1024
+# Longest frame a worker accepts from the broker (one log line plus header)
+MAX_FRAME_SIZE = 256 * 1024 * 1024
+
+
+class _ClientSubscription(Subscription):
+    """Broker side subscription that writes events straight to a worker connection."""
+
+    def __init__(self, session_id: str, writer: asyncio.StreamWriter):
+        super().__init__(session_id)
+        self.writer = writer
+
+    def deliver(self, event):
+        if self.closed or self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > MAX_CLIENT_BUFFER:
+            self.close("Worker fell too far behind")
+            self.writer.close()
+            return
+        if isinstance(event, CatalogEvent):
+            frame = f"C\t{event.kind}\t{event.session_id}\t{event.previous_size}\t{event.size}\n"
+        else:
+            frame = f"E\t{event.session_id}\t{event.offset}\t{event.end}\t{event.line}\n"
+        self.writer.write(frame.encode("utf-8"))
+
+
+async def serve(socket_path: str, hub: TailHub):
+    """Serve the hub on a Unix socket until cancelled."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriptions: Dict[str, _ClientSubscription] = {}
+        watch: Optional[_ClientSubscription] = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode("utf-8").rstrip("\n").split("\t")
+                op, session_id = parts[0], parts[1] if len(parts) > 1 else ""
+                if op == "S" and session_id not in subscriptions:
+                    subscription = await hub.subscribe(session_id, _ClientSubscription(session_id, writer))
+                    if subscription is None:
+                        writer.write(f"X\t{session_id}\tSession log file not found: {session_id}\n".encode("utf-8"))
+                    else:
+                        subscriptions[session_id] = subscription
+                        writer.write(f"O\t{session_id}\t{subscription.offset}\n".encode("utf-8"))
+                elif op == "U" and session_id in subscriptions:
+                    hub.unsubscribe(subscriptions.pop(session_id))
+                elif op == "W" and watch is None:
+                    watch = await hub.watch(_ClientSubscription(CATALOG, writer))
+                elif op == "V" and watch is not None:
+                    hub.unwatch(watch)
+                    watch = None
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            for subscription in subscriptions.values():
+                hub.unsubscribe(subscription)
+            if watch is not None:
+                hub.unwatch(watch)
+            writer.close()
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = await asyncio.start_unix_server(handle, path=socket_path)
+    async with server:
+        await server.serve_forever()
+
+
+class RemoteTailHub:
+    """
+    Worker side stand-in for TailHub that gets its events from the broker.
+
+    It offers the same subscribe()/unsubscribe() interface, so endpoints do not
+    need to know whether they run in a single process or behind the broker.
+    """
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        # Position up to which this worker has received events, per session
+        self._positions: Dict[str, int] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._watchers: Set[Subscription] = set()
+
+    async def _ensure_connected(self):
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            reader, self._writer = await asyncio.open_unix_connection(self.socket_path, limit=MAX_FRAME_SIZE)
+            self._reader_task = asyncio.create_task(self._read_frames(reader))
+
+    async def _read_frames(self, reader: asyncio.StreamReader):
+        error = "Lost connection to the event broker"
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = line.decode("utf-8").rstrip("\n")
+                kind, rest = frame[0], frame[2:]
+                if kind == "E":
+                    session_id, offset, end, text = rest.split("\t", 3)
+                    event = TailEvent(session_id, int(offset), int(end), text, parse_line(text))
+                    self._positions[session_id] = event.end
+                    for subscription in list(self._subscribers.get(session_id, ())):
+                        subscription.deliver(event)
+                elif kind == "C":
+                    change, session_id, previous_size, size = rest.split("\t", 3)
+                    event = CatalogEvent(change, session_id, int(previous_size), int(size))
+                    for subscription in list(self._watchers):
+                        subscription.deliver(event)
+                elif kind == "O":
+                    session_id, offset = rest.split("\t", 1)
+                    self._positions[session_id] = int(offset)
+                    future = self._pending.pop(session_id, None)
+                    if future and not future.done():
+                        future.set_result(True)
+                elif kind == "X":
+                    session_id, message = rest.split("\t", 1)
+                    future = self._pending.pop(session_id, None)
+                    if future and not future.done():
+                        future.set_result(False)
+                    for subscription in self._subscribers.pop(session_id, ()):
+                        subscription.close(message)
+        except Exception as e:
+            error = f"Event broker error: {str(e)}"
+        finally:
+            # Fail everything that depended on this connection, the next subscribe reconnects
+            self._writer = None
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_result(False)
+            self._pending.clear()
+            for subscriptions in self._subscribers.values():
+                for subscription in subscriptions:
+                    subscription.close(error)
+            self._subscribers.clear()
+            self._positions.clear()
+            for subscription in self._watchers:
+                subscription.close(error)
+            self._watchers.clear()
+
+    async def subscribe(self, session_id: str, subscription: Optional[Subscription] = None) -> Optional[Subscription]:
+        subscription = subscription or Subscription(session_id)
+        if session_id not in self._subscribers:
+            await self._ensure_connected()
+            future = self._pending.get(session_id)
+            if future is None:
+                future = asyncio.get_running_loop().create_future()
+                self._pending[session_id] = future
+                self._writer.write(f"S\t{session_id}\n".encode("utf-8"))
+            if not await future:
+                return None
+            self._subscribers.setdefault(session_id, set())
+        subscription.offset = self._positions.get(session_id, 0)
+        self._subscribers[session_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.session_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.session_id]
+            self._positions.pop(subscription.session_id, None)
+            if self._writer is not None and not self._writer.is_closing():
+                self._writer.write(f"U\t{subscription.session_id}\n".encode("utf-8"))
+
+    async def watch(self, subscription: Optional[Subscription] = None) -> Subscription:
+        subscription = subscription or Subscription(CATALOG)
+        if not self._watchers:
+            await self._ensure_connected()
+            self._writer.write(b"W\n")
+        self._watchers.add(subscription)
+        return subscription
+
+    def unwatch(self, subscription: Subscription):
+        if subscription not in self._watchers:
+            return
+        self._watchers.discard(subscription)
+        if not self._watchers and self._writer is not None and not self._writer.is_closing():
+            self._writer.write(b"V\n")
+
+    def stats(self):
+        return {
+            "broker": self.socket_path,
+            "sessions": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "watchers": len(self._watchers),
+        }
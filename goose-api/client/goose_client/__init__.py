@@ -0,0 +1,19 @@
+"""
+Asyncio client for the Goose Terminal API.
+"""
+from .client import GooseClient, SessionUpdate
+from .errors import GooseAPIError, GooseConnectionError, GooseError, RateLimited, StreamError
+from .sse import ServerSentEvent
+
+__version__ = "0.1.0"
+
+__all__ = [
+    "GooseAPIError",
+    "GooseClient",
+    "GooseConnectionError",
+    "GooseError",
+    "RateLimited",
+    "ServerSentEvent",
+    "SessionUpdate",
+    "StreamError",
+]
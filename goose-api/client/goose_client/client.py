@@ -0,0 +1,418 @@
+"""
+Asyncio client for the Goose Terminal API.
+
+A GooseClient keeps one pool of keep-alive connections (HTTP/1.1, or HTTP/2
+when the API sits behind a proxy that speaks it) and is safe to share between
+any number of tasks, so one process can drive hundreds of sessions at once.
+
+Streams survive dropped connections: the client remembers the byte offset of
+the last entry it received (the `end` of every event) and reconnects with it,
+so the server only sends what was missed. Requests that were not admitted
+(429) are retried after the delay the server asks for.
+"""
+import asyncio
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import httpx
+
+from .errors import GooseAPIError, GooseConnectionError, GooseError, RateLimited, StreamError, parse_retry_after
+from .sse import ServerSentEvent, iter_events
+
+DEFAULT_BASE_URL = "http://localhost:8000"
+DEFAULT_API_KEY = "talktomegoose"
+DEFAULT_TMUX_SESSION = "goose-controller"
+DEFAULT_TMUX_WINDOW = "goose"
+
+# The server pings open streams every half second, a stream silent for this long is dead
+STREAM_READ_TIMEOUT = 30.0
+# Longest pause between reconnects and between retries of a rate limited request
+MAX_BACKOFF = 10.0
+
+
+class SessionUpdate(NamedTuple):
+    session_id: str
+    offset: int  # Byte offset of the entry in the session log
+    end: int  # Byte offset just past the entry, resume from here
+    entry: Any
+
+
+def _params(**params: Any) -> Dict[str, Any]:
+    """Drop unset query parameters and join lists with commas."""
+    result = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = ",".join(value)
+        elif isinstance(value, bool):
+            value = "true" if value else "false"
+        result[name] = value
+    return result
+
+
+def _backoff(attempt: int) -> float:
+    return min(MAX_BACKOFF, 0.5 * 2 ** attempt)
+
+
+class GooseClient:
+    """Client for one Goose Terminal API, or one gateway in front of many."""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, api_key: Optional[str] = None, *,
+                 timeout: float = 30.0, http2: bool = False, max_connections: Optional[int] = None,
+                 max_keepalive_connections: int = 32, retries: int = 3, max_reconnects: int = 5,
+                 _http: Optional[httpx.AsyncClient] = None, _prefix: str = "/api"):
+        """
+        Args:
+            base_url: URL of the API, e.g. http://localhost:8000
+            api_key: The X-API-Key, defaults to the PASSWORD environment variable
+            timeout: Seconds to wait for a response
+            http2: Use HTTP/2 (needs the h2 package, and uvicorn itself only speaks HTTP/1.1)
+            max_connections: Limit of open connections, None for no limit. Every open
+                stream holds a connection
+            max_keepalive_connections: Idle connections kept open for reuse
+            retries: Retries of a request that was rate limited or, for reads, could not connect
+            max_reconnects: Consecutive failed reconnects after which a stream gives up
+        """
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get("PASSWORD", DEFAULT_API_KEY)
+        self.timeout = timeout
+        self.retries = retries
+        self.max_reconnects = max_reconnects
+        self._prefix = _prefix
+        self._owns_http = _http is None
+        self._http = _http or httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"X-API-Key": self.api_key},
+            timeout=timeout,
+            http2=http2,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+        )
+
+    async def __aenter__(self) -> "GooseClient":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._owns_http:
+            await self._http.aclose()
+
+    def backend(self, name: str) -> "GooseClient":
+        """
+        Get a client for one backend of a gateway, sharing this client's connections.
+
+        Its requests go to /api/backends/{name}/ on the gateway.
+        """
+        return GooseClient(
+            self.base_url, self.api_key, timeout=self.timeout, retries=self.retries,
+            max_reconnects=self.max_reconnects, _http=self._http, _prefix=f"/api/backends/{name}"
+        )
+
+    # --- Requests ---
+
+    @staticmethod
+    def _error(response: httpx.Response) -> GooseAPIError:
+        try:
+            detail = response.json().get("detail", response.text)
+        except ValueError:
+            detail = response.text
+        if response.status_code == 429:
+            return RateLimited(detail, parse_retry_after(response.headers.get("retry-after")))
+        return GooseAPIError(response.status_code, detail)
+
+    async def _request(self, method: str, path: str, *, params: Optional[Dict[str, Any]] = None,
+                       json: Any = None, timeout: Optional[float] = None, accept: Iterable[int] = ()) -> Any:
+        """Send a request and decode its JSON response, retrying when that is safe."""
+        attempt = 0
+        while True:
+            try:
+                response = await self._http.request(
+                    method, self._prefix + path, params=params, json=json,
+                    timeout=timeout if timeout is not None else self.timeout
+                )
+            except httpx.TransportError as e:
+                # Only reads are repeated, a command may have arrived before the connection broke
+                if method != "GET" or attempt >= self.retries:
+                    raise GooseConnectionError(f"{method} {path} failed: {type(e).__name__}: {e}") from e
+                await asyncio.sleep(_backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code < 400 or response.status_code in accept:
+                return response.json()
+            error = self._error(response)
+            if isinstance(error, RateLimited) and attempt < self.retries:
+                await asyncio.sleep(min(MAX_BACKOFF, error.retry_after or 1))
+                attempt += 1
+                continue
+            raise error
+
+    async def ping(self, deep: bool = False) -> Dict[str, Any]:
+        """Status of the API and its services, `deep` runs the checks on the spot."""
+        return await self._request("GET", "/ping", params=_params(deep=deep or None))
+
+    async def ready(self) -> Dict[str, Any]:
+        """Whether the session catalog is warm, see GET /api/ready."""
+        return await self._request("GET", "/ready", accept=(503,))
+
+    async def send_command(self, command: str, session: str = DEFAULT_TMUX_SESSION,
+                           window: str = DEFAULT_TMUX_WINDOW) -> Dict[str, Any]:
+        """Type a command into a tmux window."""
+        return await self._request(
+            "POST", "/terminal/send", json={"command": command, "session": session, "window": window}
+        )
+
+    async def terminal_sessions(self) -> Dict[str, Any]:
+        return await self._request("GET", "/terminal/sessions")
+
+    async def list_sessions(self, summary: bool = False) -> List[Dict[str, Any]]:
+        return await self._request("GET", "/sessions", params=_params(summary=summary or None))
+
+    async def get_session(self, session_id: str, format: str = "json", *, roles: Optional[List[str]] = None,
+                          content_types: Optional[List[str]] = None, fields: Optional[List[str]] = None,
+                          audience: Optional[str] = None, truncate: Optional[int] = None) -> Dict[str, Any]:
+        """Get a session log, optionally filtered and projected on the server."""
+        params = _params(
+            format=None if format == "json" else format, roles=roles, content_types=content_types,
+            fields=fields, audience=audience, truncate=truncate
+        )
+        return await self._request("GET", f"/sessions/{session_id}", params=params)
+
+    async def get_changes(self, session_id: str, since: int = 0, wait: float = 0, limit: int = 1000) -> Dict[str, Any]:
+        """Get the entries appended after a byte offset, waiting up to `wait` seconds for new ones."""
+        return await self._request(
+            "GET", f"/sessions/{session_id}/changes", params=_params(since=since, wait=wait, limit=limit),
+            timeout=self.timeout + wait
+        )
+
+    async def session_stats(self, session_id: str) -> Dict[str, Any]:
+        return await self._request("GET", f"/sessions/{session_id}/stats")
+
+    async def latest_session_id(self) -> str:
+        return (await self._request("GET", "/sessions/latest/id"))["session_id"]
+
+    async def restore_session(self, session_id: str) -> Dict[str, Any]:
+        return await self._request("POST", f"/sessions/{session_id}/restore")
+
+    async def search(self, q: str, limit: int = 20, session_id: Optional[str] = None,
+                     role: Optional[str] = None) -> Dict[str, Any]:
+        return await self._request("GET", "/search", params=_params(q=q, limit=limit, session_id=session_id, role=role))
+
+    async def search_status(self) -> Dict[str, Any]:
+        return await self._request("GET", "/search/status")
+
+    async def stream_status(self) -> Dict[str, Any]:
+        return await self._request("GET", "/stream/status")
+
+    async def admission_status(self) -> Dict[str, Any]:
+        return await self._request("GET", "/admission/status")
+
+    async def gateway_status(self) -> Dict[str, Any]:
+        """State of every backend, only available on a gateway."""
+        return await self._request("GET", "/gateway/status")
+
+    # --- Streams ---
+
+    async def _sse(self, path: str, payload: Dict[str, Any],
+                   on_connect: Callable[[], None]) -> AsyncIterator[ServerSentEvent]:
+        timeout = httpx.Timeout(self.timeout, read=STREAM_READ_TIMEOUT)
+        async with self._http.stream("POST", self._prefix + path, json=payload, timeout=timeout) as response:
+            if response.status_code >= 400:
+                await response.aread()
+                raise self._error(response)
+            on_connect()
+            async for event in iter_events(response.aiter_lines()):
+                yield event
+
+    def _reconnect_delay(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before the next connection attempt, or give up after too many in a row."""
+        if attempt > self.max_reconnects:
+            raise GooseConnectionError(f"Stream lost after {attempt - 1} reconnects: {error}") from error
+        if isinstance(error, RateLimited) and error.retry_after is not None:
+            return min(MAX_BACKOFF, error.retry_after)
+        return _backoff(attempt - 1)
+
+    @staticmethod
+    def _can_reconnect(error: Exception) -> bool:
+        if isinstance(error, GooseAPIError):
+            return error.status_code == 429 or error.status_code >= 500
+        return isinstance(error, (httpx.TransportError, GooseConnectionError))
+
+    async def stream(self, command: Optional[str] = None, session_id: Optional[str] = None, *,
+                     tmux_session: str = DEFAULT_TMUX_SESSION, tmux_window: str = DEFAULT_TMUX_WINDOW,
+                     roles: Optional[List[str]] = None, content_types: Optional[List[str]] = None,
+                     fields: Optional[List[str]] = None, audience: Optional[str] = None,
+                     truncate: Optional[int] = None, since: Optional[int] = None,
+                     reconnect: bool = True) -> AsyncIterator[ServerSentEvent]:
+        """
+        Send an optional command and follow the session until the assistant replies.
+
+        Yields the events of POST /api/stream and returns after `conversation_complete`.
+        When the connection drops the stream reconnects and resumes from the last
+        offset it received, announcing every attempt with a `reconnecting` event.
+        The command is sent at most once: it is not repeated once the server
+        accepted the request.
+
+        Raises:
+            StreamError: If the server sends an `error` event
+            GooseConnectionError: If the connection could not be resumed
+        """
+        payload: Dict[str, Any] = {
+            "command": command, "session_id": session_id, "tmux_session": tmux_session, "tmux_window": tmux_window,
+            "roles": roles, "content_types": content_types, "fields": fields, "audience": audience,
+            "truncate": truncate, "since": since,
+        }
+
+        def connected():
+            payload["command"] = None
+
+        attempt = 0
+        while True:
+            events = self._sse("/stream", payload, connected)
+            try:
+                async for event in events:
+                    attempt = 0
+                    data = event.data if isinstance(event.data, dict) else {}
+                    if event.event == "session_identified":
+                        payload["session_id"] = data["session_id"]
+                    elif event.event in ("initial_state", "update") and "end" in data:
+                        payload["since"] = data["end"]
+                    elif event.event == "error":
+                        raise StreamError(data.get("error", event.data))
+                    yield event
+                    if event.event == "conversation_complete":
+                        return
+                error: Exception = GooseConnectionError("Stream ended before the assistant replied")
+            except (httpx.TransportError, GooseError) as e:
+                if isinstance(e, StreamError) or not self._can_reconnect(e):
+                    raise
+                error = e
+            finally:
+                # Release the connection right away, also when the caller stops early
+                await events.aclose()
+
+            if not reconnect:
+                raise GooseConnectionError(str(error)) from error
+            if command and payload["session_id"] is None and payload["command"] is None:
+                raise GooseConnectionError(f"Stream lost before the session was identified: {error}") from error
+            attempt += 1
+            delay = self._reconnect_delay(attempt, error)
+            # Without an offset yet the stream starts over with initial_state
+            yield ServerSentEvent("reconnecting", {"attempt": attempt, "delay": delay, "offset": payload["since"], "error": str(error)})
+            await asyncio.sleep(delay)
+
+    async def firehose(self, session_ids: Optional[List[str]] = None, pattern: Optional[str] = None,
+                       all: bool = False, active_within: float = 3600, offsets: Optional[Dict[str, int]] = None,
+                       reconnect: bool = True) -> AsyncIterator[ServerSentEvent]:
+        """
+        Follow many sessions on one connection, see POST /api/stream/firehose.
+
+        Runs until the caller stops iterating. The offset of every followed session is
+        tracked, and after a dropped connection the stream resumes each of them from
+        where it was, announcing every attempt with a `reconnecting` event.
+
+        Args:
+            offsets: Resume these sessions from byte offsets, e.g. the `end` of the last update seen
+        """
+        offsets = dict(offsets or {})
+        attempt = 0
+        while True:
+            payload = {
+                "session_ids": session_ids, "pattern": pattern, "all": all,
+                "active_within": active_within, "offsets": offsets or None,
+            }
+            events = self._sse("/stream/firehose", payload, lambda: None)
+            try:
+                async for event in events:
+                    attempt = 0
+                    data = event.data if isinstance(event.data, dict) else {}
+                    if event.event == "subscribed":
+                        offsets.setdefault(data["session_id"], data["offset"])
+                    elif event.event == "update":
+                        offsets[data["session_id"]] = data["end"]
+                    elif event.event == "session_idle":
+                        offsets.pop(data["session_id"], None)
+                    elif event.event == "error":
+                        # The server ends the stream after an error, pick it up again from the offsets
+                        raise GooseConnectionError(data.get("error", event.data))
+                    yield event
+                error: Exception = GooseConnectionError("Stream ended")
+            except (httpx.TransportError, GooseError) as e:
+                if not self._can_reconnect(e):
+                    raise
+                error = e
+            finally:
+                await events.aclose()
+
+            if not reconnect:
+                raise GooseConnectionError(str(error)) from error
+            attempt += 1
+            delay = self._reconnect_delay(attempt, error)
+            yield ServerSentEvent("reconnecting", {"attempt": attempt, "delay": delay, "offsets": dict(offsets), "error": str(error)})
+            await asyncio.sleep(delay)
+
+    async def monitor(self, session_ids: List[str], offsets: Optional[Dict[str, int]] = None) -> AsyncIterator[SessionUpdate]:
+        """Yield the entries appended to any of these sessions, over one resuming firehose connection."""
+        async for event in self.firehose(session_ids=session_ids, offsets=offsets):
+            if event.event == "update":
+                data = event.data
+                yield SessionUpdate(data["session_id"], data["offset"], data["end"], data["entry"])
+
+    async def follow_changes(self, session_id: str, since: int = 0, wait: float = 30,
+                             limit: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield the entries appended to a session by long-polling GET /api/sessions/{id}/changes.
+
+        For networks that do not let streams through. Each entry comes with its
+        `offset` and `end`, the last `end` is where to continue from later.
+        """
+        while True:
+            changes = await self.get_changes(session_id, since, wait, limit)
+            for entry in changes["entries"]:
+                yield entry
+            since = changes["next_offset"]
+
+    def websocket(self, reconnect: bool = True) -> "WebSocketChannel":
+        """
+        Get a WebSocket channel to /api/ws, use it with `async with`.
+
+        Needs the websockets package. WebSockets are not proxied by a gateway.
+        """
+        from .websocket import WebSocketChannel
+        return WebSocketChannel(self.base_url, self.api_key, reconnect=reconnect, max_reconnects=self.max_reconnects)
+
+    # --- Bulk helpers ---
+
+    @staticmethod
+    async def _gather(keys: Iterable[str], fetch: Callable[[str], Awaitable[Any]], concurrency: int) -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(key: str) -> Any:
+            async with semaphore:
+                try:
+                    return await fetch(key)
+                except GooseError as e:
+                    return e
+
+        keys = list(keys)
+        return dict(zip(keys, await asyncio.gather(*(one(key) for key in keys))))
+
+    async def fetch_logs(self, session_ids: Optional[Iterable[str]] = None, *, concurrency: int = 16,
+                         **filters: Any) -> Dict[str, Any]:
+        """
+        Fetch many session logs concurrently, all sessions when no IDs are given.
+
+        Keyword arguments are passed on to get_session. A session that could not be
+        fetched maps to the GooseError it raised instead of its log.
+        """
+        if session_ids is None:
+            session_ids = [session["session_id"] for session in await self.list_sessions()]
+        return await self._gather(session_ids, lambda session_id: self.get_session(session_id, **filters), concurrency)
+
+    async def fetch_stats(self, session_ids: Optional[Iterable[str]] = None, *, concurrency: int = 16) -> Dict[str, Any]:
+        """Fetch the stats of many sessions concurrently, errors map to the GooseError they raised."""
+        if session_ids is None:
+            session_ids = [session["session_id"] for session in await self.list_sessions()]
+        return await self._gather(session_ids, self.session_stats, concurrency)
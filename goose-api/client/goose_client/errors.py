@@ -0,0 +1,44 @@
+"""
+Exceptions raised by the Goose API client.
+"""
+import math
+from typing import Any, Optional
+
+
+class GooseError(Exception):
+    """Base class of all client errors."""
+
+
+class GooseConnectionError(GooseError):
+    """The API could not be reached, or the connection broke and could not be resumed."""
+
+
+class GooseAPIError(GooseError):
+    """The API answered with an error status."""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"HTTP {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+class RateLimited(GooseAPIError):
+    """The request was not admitted (429) and retries ran out."""
+
+    def __init__(self, detail: Any, retry_after: Optional[float]):
+        super().__init__(429, detail)
+        self.retry_after = retry_after
+
+
+class StreamError(GooseError):
+    """The server ended a stream with an `error` event."""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        return None
+    return seconds if math.isfinite(seconds) and seconds >= 0 else None
@@ -0,0 +1,41 @@
+"""
+Incremental parsing of Server-Sent Events.
+"""
+import json
+from typing import Any, AsyncIterator, NamedTuple
+
+
+class ServerSentEvent(NamedTuple):
+    event: str  # Event type, e.g. "update"
+    data: Any  # Decoded JSON data, or the raw string if it is not JSON
+
+
+def _decode(data: str) -> Any:
+    try:
+        return json.loads(data)
+    except ValueError:
+        return data
+
+
+async def iter_events(lines: AsyncIterator[str]) -> AsyncIterator[ServerSentEvent]:
+    """Turn the lines of an SSE response body into events as they arrive."""
+    event = "message"
+    data = []
+    async for line in lines:
+        line = line.rstrip("\r\n")
+        if not line:
+            if data:
+                yield ServerSentEvent(event, _decode("\n".join(data)))
+            event, data = "message", []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "event":
+            event = value
+        elif field == "data":
+            data.append(value)
+    if data:
+        yield ServerSentEvent(event, _decode("\n".join(data)))
@@ -0,0 +1,146 @@
+"""
+Reconnecting WebSocket channel to /api/ws.
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+import websockets
+
+from .errors import GooseAPIError, GooseConnectionError
+
+# Close codes the server uses for a missing or invalid API key
+AUTH_CLOSE_CODES = {4401: 401, 4403: 403}
+MAX_BACKOFF = 10.0
+
+
+class WebSocketChannel:
+    """
+    One /api/ws connection that follows any number of sessions and survives disconnects.
+
+    The channel remembers the sessions it follows and the `end` offset of the last
+    entry of each. After a dropped connection it reconnects, subscribes to them
+    again from those offsets and yields a `reconnected` message, so entries are
+    neither lost nor repeated. Prompts that were in flight are not sent again.
+    """
+
+    def __init__(self, base_url: str, api_key: str, reconnect: bool = True, max_reconnects: int = 5):
+        scheme, _, rest = base_url.partition("://")
+        ws_scheme = "wss" if scheme == "https" else "ws"
+        self.url = f"{ws_scheme}://{rest.rstrip('/')}/api/ws"
+        # Sent as a header, a query parameter would end up in access logs
+        self.headers = {"X-API-Key": api_key}
+        self.reconnect = reconnect
+        self.max_reconnects = max_reconnects
+        self.offsets: Dict[str, int] = {}  # Followed session -> end of the last entry received
+        self._socket = None
+        self._closing = False
+
+    async def __aenter__(self) -> "WebSocketChannel":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def connect(self):
+        try:
+            self._socket = await websockets.connect(self.url, extra_headers=self.headers)
+        except websockets.InvalidStatusCode as e:
+            # Servers before close codes were sent after the handshake, and proxies, refuse with a status
+            if e.status_code in (401, 403):
+                raise GooseAPIError(e.status_code, "Invalid or missing API key") from e
+            raise GooseConnectionError(f"WebSocket connection failed: {e}") from e
+        except (OSError, websockets.WebSocketException) as e:
+            raise GooseConnectionError(f"WebSocket connection failed: {e}") from e
+
+    async def close(self):
+        self._closing = True
+        if self._socket is not None:
+            await self._socket.close()
+
+    @staticmethod
+    def _closed_error(e: websockets.ConnectionClosed) -> Exception:
+        """The error for a closed connection, auth failures are not worth reconnecting for."""
+        code = e.rcvd.code if e.rcvd else None
+        if code in AUTH_CLOSE_CODES:
+            return GooseAPIError(AUTH_CLOSE_CODES[code], "Invalid or missing API key")
+        return GooseConnectionError(f"WebSocket closed: {e}")
+
+    async def _send(self, message: Dict[str, Any]):
+        try:
+            await self._socket.send(json.dumps({k: v for k, v in message.items() if v is not None}))
+        except websockets.ConnectionClosed as e:
+            raise self._closed_error(e) from e
+
+    async def subscribe(self, session_id: str, since: Optional[int] = None, id: Optional[str] = None):
+        """Follow a session, from `since` or the last offset this channel received for it."""
+        if since is None:
+            since = self.offsets.get(session_id, 0)
+        self.offsets[session_id] = since
+        await self._send({"type": "subscribe", "session_id": session_id, "since": since, "id": id})
+
+    async def unsubscribe(self, session_id: str):
+        self.offsets.pop(session_id, None)
+        await self._send({"type": "unsubscribe", "session_id": session_id})
+
+    async def prompt(self, command: str, session_id: Optional[str] = None, id: Optional[str] = None,
+                     tmux_session: Optional[str] = None, tmux_window: Optional[str] = None):
+        """Send a prompt, the channel then follows the session it lands in."""
+        since = self.offsets.get(session_id) if session_id else None
+        await self._send({
+            "type": "prompt", "command": command, "session_id": session_id, "since": since, "id": id,
+            "tmux_session": tmux_session, "tmux_window": tmux_window,
+        })
+
+    async def ping(self):
+        await self._send({"type": "ping"})
+
+    def _track(self, message: Dict[str, Any]):
+        session_id = message.get("session_id")
+        kind = message.get("type")
+        if kind == "session_identified":
+            self.offsets.setdefault(session_id, 0)
+        elif kind == "history":
+            self.offsets[session_id] = message["offset"]
+        elif kind == "update":
+            self.offsets[session_id] = message["end"]
+
+    async def _resume(self, error: Exception):
+        for attempt in range(1, self.max_reconnects + 1):
+            await asyncio.sleep(min(MAX_BACKOFF, 0.5 * 2 ** (attempt - 1)))
+            try:
+                await self.connect()
+            except GooseConnectionError as e:
+                error = e
+                continue
+            try:
+                for session_id, since in list(self.offsets.items()):
+                    await self._send({"type": "subscribe", "session_id": session_id, "since": since})
+            except GooseConnectionError as e:
+                # Closed again right away, e.g. refused by admission control
+                error = e
+                continue
+            return
+        raise GooseConnectionError(f"WebSocket lost after {self.max_reconnects} reconnects: {error}") from error
+
+    async def messages(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the messages of the server until the channel is closed."""
+        while True:
+            try:
+                raw = await self._socket.recv()
+            except websockets.ConnectionClosed as e:
+                if self._closing:
+                    return
+                error = self._closed_error(e)
+                if isinstance(error, GooseAPIError) or not self.reconnect:
+                    raise error from e
+                await self._resume(e)
+                yield {"type": "reconnected", "sessions": dict(self.offsets)}
+                continue
+            message = json.loads(raw)
+            self._track(message)
+            yield message
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.messages()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Example script to download many Goose session logs concurrently.
+
+Usage:
+    # Export every session into ./export
+    python export_sessions.py
+
+    # Export some sessions, only the conversation text
+    python export_sessions.py 20250308_123456 20250308_140000 --text-only --output logs
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from goose_client import GooseClient, GooseError
+
+API_BASE = os.environ.get("GOOSE_API_URL", "http://localhost:8000")
+
+async def main(session_ids, output, text_only, concurrency):
+    os.makedirs(output, exist_ok=True)
+    # Only keep user and assistant text when asked, the server filters before sending
+    filters = {"roles": ["user", "assistant"], "content_types": ["text"]} if text_only else {}
+
+    start = time.perf_counter()
+    async with GooseClient(API_BASE) as client:
+        logs = await client.fetch_logs(session_ids or None, concurrency=concurrency, **filters)
+
+    exported = 0
+    for session_id, log in logs.items():
+        if isinstance(log, GooseError):
+            print(f"❌ {session_id}: {log}")
+            continue
+        with open(os.path.join(output, f"{session_id}.json"), "w") as f:
+            json.dump(log, f)
+        exported += 1
+    print(f"Exported {exported} of {len(logs)} sessions to {output} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download Goose session logs")
+    parser.add_argument("session_ids", nargs="*", help="Sessions to export, all when none are given")
+    parser.add_argument("--output", "-o", default="export", help="Directory to write the logs to")
+    parser.add_argument("--text-only", action="store_true", help="Only export user and assistant text")
+    parser.add_argument("--concurrency", "-c", type=int, default=16, help="Logs downloaded at the same time")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(main(args.session_ids, args.output, args.text_only, args.concurrency))
+    except GooseError as e:
+        print(f"❌ {e}")
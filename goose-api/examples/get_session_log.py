@@ -2,77 +2,26 @@
 """
 Example script to fetch and display a Goose session log via the API.
 """
-import requests
-import sys
-import json
+import asyncio
 import os
+import sys
 from datetime import datetime
 
-API_BASE = "http://localhost:8000"
-API_KEY = os.environ.get("PASSWORD", "talktomegoose")
-
-def get_latest_session_id():
-    """Get the ID of the most recent session."""
-    url = f"{API_BASE}/api/sessions/latest/id"
-    
-    headers = {
-        "X-API-Key": API_KEY
-    }
-    
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()["session_id"]
-    except requests.exceptions.RequestException as e:
-        print(f"Error getting latest session ID: {e}")
-        return None
+from goose_client import GooseClient, GooseError
 
-def get_session_logs(session_id, format="json"):
-    """Fetch the logs for a specific session."""
-    url = f"{API_BASE}/api/sessions/{session_id}"
-    
-    if format != "json":
-        url += f"?format={format}"
-    
-    headers = {
-        "X-API-Key": API_KEY
-    }
-    
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching session logs: {e}")
-        return None
-
-def list_available_sessions():
-    """List all available session logs."""
-    url = f"{API_BASE}/api/sessions"
-    
-    headers = {
-        "X-API-Key": API_KEY
-    }
-    
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error listing sessions: {e}")
-        return None
+API_BASE = os.environ.get("GOOSE_API_URL", "http://localhost:8000")
 
 def display_conversation(log_data):
     """Display the conversation in a human-readable format."""
     print("\n=== GOOSE CONVERSATION LOG ===\n")
-    
+
     for entry in log_data["entries"]:
         data = entry["data"]
         if "role" in data:
             role = data["role"].upper()
             content = data.get("content", "")
             timestamp = data.get("timestamp", "")
-            
+
             if timestamp:
                 try:
                     dt = datetime.fromtimestamp(timestamp)
@@ -81,27 +30,32 @@ def display_conversation(log_data):
                     time_str = str(timestamp)
             else:
                 time_str = "unknown time"
-                
+
             print(f"[{time_str}] {role}:")
             print(f"{content}\n{'-' * 50}\n")
 
-if __name__ == "__main__":
-    # Check for session ID argument
-    if len(sys.argv) > 1:
-        session_id = sys.argv[1]
-        print(f"Fetching logs for session: {session_id}")
-    else:
-        # Get the most recent session
-        print("No session ID provided, fetching most recent session...")
-        session_id = get_latest_session_id()
-        if not session_id:
-            print("Could not retrieve latest session ID.")
+async def main(session_id=None):
+    async with GooseClient(API_BASE) as client:
+        if session_id:
+            print(f"Fetching logs for session: {session_id}")
+        else:
+            # Get the most recent session
+            print("No session ID provided, fetching most recent session...")
+            try:
+                session_id = await client.latest_session_id()
+            except GooseError as e:
+                print(f"Could not retrieve latest session ID: {e}")
+                sys.exit(1)
+            print(f"Using latest session: {session_id}")
+
+        # Get and display session logs
+        try:
+            logs = await client.get_session(session_id)
+        except GooseError as e:
+            print(f"Failed to retrieve session logs: {e}")
             sys.exit(1)
-        print(f"Using latest session: {session_id}")
-    
-    # Get and display session logs
-    logs = get_session_logs(session_id)
-    if logs:
-        display_conversation(logs)
-    else:
-        print("Failed to retrieve session logs.") 
\ No newline at end of file
+
+    display_conversation(logs)
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None))
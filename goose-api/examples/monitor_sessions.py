@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Example script to follow many Goose sessions at once over a single connection.
+
+Usage:
+    # Follow some sessions
+    python monitor_sessions.py 20250308_123456 20250308_140000
+
+    # Follow every session that changes
+    python monitor_sessions.py --all
+
+The stream resumes from the last message it received when the connection drops.
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime
+
+from goose_client import GooseClient, GooseError
+
+API_BASE = os.environ.get("GOOSE_API_URL", "http://localhost:8000")
+
+def summarize(entry):
+    """One line summary of a log entry."""
+    role = entry.get("role", "metadata").upper()
+    for item in entry.get("content") or []:
+        if item.get("type") == "text":
+            return f"{role}: {item.get('text', '')[:100]}"
+        if item.get("type") == "toolRequest":
+            name = item.get("toolCall", {}).get("value", {}).get("name", "unknown_tool")
+            return f"{role}: 🛠️  {name}"
+        if item.get("type") == "toolResponse":
+            return f"{role}: 🔄 tool response"
+    return role
+
+async def main(session_ids, follow_all):
+    async with GooseClient(API_BASE) as client:
+        async for event in client.firehose(session_ids=session_ids or None, all=follow_all):
+            timestamp = datetime.now().strftime("%H:%M:%S")
+            data = event.data
+            if event.event == "update":
+                print(f"[{timestamp}] {data['session_id']} {summarize(data['entry'])}")
+            elif event.event == "subscribed":
+                print(f"[{timestamp}] Following {data['session_id']}")
+            elif event.event == "session_created":
+                print(f"[{timestamp}] New session {data['session_id']}")
+            elif event.event == "reconnecting":
+                print(f"[{timestamp}] ⚠️ Connection lost, reconnecting in {data['delay']:.1f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Follow many Goose sessions")
+    parser.add_argument("session_ids", nargs="*", help="Sessions to follow")
+    parser.add_argument("--all", "-a", action="store_true", help="Follow every session that changes")
+    args = parser.parse_args()
+
+    if not args.session_ids and not args.all:
+        parser.error("Give session IDs or --all")
+
+    try:
+        asyncio.run(main(args.session_ids, args.all))
+    except KeyboardInterrupt:
+        pass
+    except GooseError as e:
+        print(f"❌ {e}")
@@ -2,44 +2,32 @@
 """
 Example script to send a command to the shared tmux terminal via the Goose API.
 """
-import requests
-import sys
+import asyncio
 import json
 import os
+import sys
+
+from goose_client import GooseClient, GooseError
 
-API_BASE = "http://localhost:8000"
-API_KEY = os.environ.get("PASSWORD", "talktomegoose")
+API_BASE = os.environ.get("GOOSE_API_URL", "http://localhost:8000")
 
-def send_command(cmd, session="goose-controller", window="goose"):
+async def send_command(cmd, session="goose-controller", window="goose"):
     """Send a command to the specified tmux session."""
-    url = f"{API_BASE}/api/terminal/send"
-    
-    payload = {
-        "command": cmd,
-        "session": session,
-        "window": window
-    }
-    
-    headers = {
-        "X-API-Key": API_KEY
-    }
-    
-    try:
-        response = requests.post(url, json=payload, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f"Error sending command: {e}")
-        return None
+    async with GooseClient(API_BASE) as client:
+        try:
+            return await client.send_command(cmd, session, window)
+        except GooseError as e:
+            print(f"Error sending command: {e}")
+            return None
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage: python send_command.py 'command to execute'")
         sys.exit(1)
-    
+
     command = sys.argv[1]
-    result = send_command(command)
-    
+    result = asyncio.run(send_command(command))
+
     if result:
         print(json.dumps(result, indent=2))
-        print(f"Command successfully sent: '{command}'") 
\ No newline at end of file
+        print(f"Command successfully sent: '{command}'")
@@ -39,17 +39,20 @@ SSE Event Structure:
     
     - error: Sent when an error occurs
       Data: {"error": "string"}
+
+    The client adds a reconnecting event of its own when the connection drops. It
+    resumes the stream where it left off, so no message is lost or repeated.
 """
-import requests
-import sseclient
+import asyncio
 import json
 import sys
 import os
 import argparse
 from datetime import datetime
 
-API_BASE = "http://localhost:8000"
-API_KEY = os.environ.get("PASSWORD", "talktomegoose")
+from goose_client import GooseClient, GooseConnectionError, GooseError, StreamError
+
+API_BASE = os.environ.get("GOOSE_API_URL", "http://localhost:8000")
 
 def format_tool_request(content):
     """Format a tool request message for display."""
@@ -125,7 +128,7 @@ def extract_content_text(content_data):
                 text += format_tool_response([item])
     return text
 
-def stream_conversation(command=None, session_id=None, monitor_only=False):
+async def stream_conversation(command=None, session_id=None, monitor_only=False):
     """
     Simple streaming function - sends command, waits for response, exits.
     """
@@ -146,48 +149,31 @@ def stream_conversation(command=None, session_id=None, monitor_only=False):
     
     print("─" * 70)
     
-    # Prepare request payload
-    payload = {
-        "command": command,
-        "session_id": session_id,
-        "tmux_session": "goose-controller",
-        "tmux_window": "goose"
-    }
-    
-    # Include authentication header
-    headers = {
-        "X-API-Key": API_KEY
-    }
+    current_session_id = session_id
+    client = GooseClient(API_BASE)
     
     try:
-        # Send request and start streaming
-        response = requests.post(f"{API_BASE}/api/stream", json=payload, headers=headers, stream=True)
-        response.raise_for_status()
-        
-        client = sseclient.SSEClient(response)
-        current_session_id = session_id
-        
-        # Process events
-        for event in client.events():
+        # Process events, the stream resumes on its own if the connection drops
+        async for event in client.stream(command=command, session_id=session_id):
             timestamp = datetime.now().strftime("%H:%M:%S")
             
             if event.event == "command_sent":
                 # This event confirms that the command was successfully sent to the terminal
                 # It provides confirmation that the API received and processed the request
-                data = json.loads(event.data)
+                data = event.data
                 print(f"[{timestamp}] ✓ Command sent: \"{data['command']}\"")
             
             elif event.event == "session_identified":
                 # This event provides the session ID for the conversation
                 # The session ID can be used to continue the conversation later
-                data = json.loads(event.data)
+                data = event.data
                 current_session_id = data["session_id"]
                 print(f"[{timestamp}] ✓ Session ID: {current_session_id}")
             
             elif event.event == "initial_state":
                 # This event contains the complete conversation history
                 # For monitoring, it provides the current state before updates
-                data = json.loads(event.data)
+                data = event.data
                 entries = data.get("entries", [])
                 print(f"[{timestamp}] ℹ️ Received conversation history ({len(entries)} entries)")
                 # We don't print the whole history for simplicity
@@ -198,7 +184,7 @@ def stream_conversation(command=None, session_id=None, monitor_only=False):
             elif event.event == "update":
                 # This event contains new messages in the conversation
                 # It's sent whenever there's a new user or assistant message
-                data = json.loads(event.data)
+                data = event.data
                 entry = data["entry"]
                 
                 # Skip metadata entries
@@ -242,7 +228,7 @@ def stream_conversation(command=None, session_id=None, monitor_only=False):
             elif event.event == "conversation_complete":
                 # This event signals that the assistant has finished responding
                 # It's a good point to exit the streaming or prompt for the next user input
-                data = json.loads(event.data)
+                data = event.data
                 current_session_id = data["session_id"]
                 print(f"\n✓ Response complete. To continue: python streaming.py \"your message\" --session-id {current_session_id}")
                 return
@@ -252,24 +238,35 @@ def stream_conversation(command=None, session_id=None, monitor_only=False):
                 # No need to display these, but we could log them for debugging
                 pass
             
-            elif event.event == "error":
-                # Error events indicate problems with the streaming connection or request
-                data = json.loads(event.data)
-                print(f"[{timestamp}] ⚠️ Error: {data.get('error', 'Unknown error')}")
+            elif event.event == "reconnecting":
+                # Sent by the client when the connection dropped, it resumes where it left off
+                data = event.data
+                print(f"[{timestamp}] ⚠️ Connection lost, reconnecting in {data['delay']:.1f}s (attempt {data['attempt']})")
             
             # Ignore other events
     
-    except KeyboardInterrupt:
+    except asyncio.CancelledError:
+        # Ctrl+C cancels the stream
         print("\n✋ Streaming stopped by user")
     
-    except requests.exceptions.RequestException as e:
+    except StreamError as e:
+        # Error events indicate problems with the streaming request
+        print(f"\n⚠️ Error: {e}")
+    
+    except GooseConnectionError as e:
         print(f"\n❌ Connection error: {e}")
     
+    except GooseError as e:
+        print(f"\n❌ Request failed: {e}")
+    
     except Exception as e:
         print(f"\n❌ Unexpected error: {e}")
         import traceback
         traceback.print_exc()
     
+    finally:
+        await client.aclose()
+    
     # Final message if we didn't get a conversation_complete event
     if current_session_id:
         print(f"\nTo continue this conversation: python streaming.py \"your message\" --session-id {current_session_id}")
@@ -291,8 +288,11 @@ if __name__ == "__main__":
         parser.error("Either command or --session-id is required")
     
     # Start streaming
-    stream_conversation(
-        command=args.command,
-        session_id=args.session_id,
-        monitor_only=args.monitor
-    ) 
\ No newline at end of file
+    try:
+        asyncio.run(stream_conversation(
+            command=args.command,
+            session_id=args.session_id,
+            monitor_only=args.monitor
+        ))
+    except KeyboardInterrupt:
+        pass
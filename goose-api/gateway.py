@@ -0,0 +1,252 @@
+"""
+Federated gateway over many goose-api instances.
+
+In gateway mode the API has no sessions of its own. It answers from a
+configured set of backends, each a regular goose-api: listing, search and the
+latest session fan out to every backend in parallel and the answers are
+merged, everything else is proxied to one backend by name, streams included.
+
+Every backend has its own pools of keep-alive connections and every request
+to it its own deadline, so a slow node costs at most one timeout and never
+holds up the others. The partial results policy decides what happens when
+some backends fail: either the merged answer of the others is returned and
+the failures are reported next to it, or the whole request fails. A backend
+that timed out or failed is skipped for a cooldown period, so requests do not
+keep waiting on a node that is down.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+
+class Backend(NamedTuple):
+    name: str
+    url: str
+
+
+def parse_backends(spec: str) -> List[Backend]:
+    """
+    Parse a comma separated list of backends, each `name=url` or just `url`.
+
+    A backend without a name is named after the host and port of its URL.
+
+    Raises:
+        ValueError: If a URL is not an http(s) URL or a name is used twice
+    """
+    backends: List[Backend] = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, separator, url = item.partition("=")
+        if not separator:
+            name, url = "", item
+        url = url.strip().rstrip("/")
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.netloc:
+            raise ValueError(f"Invalid backend URL: {url}")
+        name = name.strip() or parts.netloc
+        if any(backend.name == name for backend in backends):
+            raise ValueError(f"Duplicate backend name: {name}")
+        backends.append(Backend(name, url))
+    return backends
+
+
+class BackendError(Exception):
+    """A backend did not answer a request."""
+
+
+class PartialResults(Exception):
+    """Some backends failed and the partial results policy does not allow answering without them."""
+
+    def __init__(self, errors: Dict[str, str]):
+        super().__init__(f"{len(errors)} backend(s) did not answer")
+        self.errors = errors
+
+
+class FanOut(NamedTuple):
+    results: Dict[str, Any]  # Backend name -> decoded JSON response, None if the backend answered 404
+    errors: Dict[str, str]  # Backend name -> why it did not answer
+
+
+class _BackendState:
+    """Connection pools, cooldown and counters of one backend."""
+
+    def __init__(self, backend: Backend, api_key: str, timeout: float, max_connections: int):
+        self.backend = backend
+        headers = {"X-API-Key": api_key}
+        self.client = httpx.AsyncClient(
+            base_url=backend.url, headers=headers, timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        # Proxied requests include streams that stay open for minutes, keep them out of the
+        # query pool and do not limit how long the backend may stay silent
+        self.proxy_client = httpx.AsyncClient(
+            base_url=backend.url, headers=headers, timeout=httpx.Timeout(timeout, read=None),
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=max_connections)
+        )
+        self.down_until = 0.0  # Monotonic time until which the backend is skipped
+        self.last_error: Optional[str] = None
+        self.latency_ms: Optional[float] = None
+        self.counters = {"requests": 0, "failures": 0, "timeouts": 0, "skipped": 0, "proxied": 0}
+
+
+class Gateway:
+    """Fans queries out to a set of goose-api backends and proxies requests to them."""
+
+    def __init__(self, backends: List[Backend], api_key: str, timeout: float = 5.0,
+                 allow_partial: bool = True, cooldown: float = 10.0, max_connections: int = 20):
+        """
+        Args:
+            backends: The goose-api instances to federate
+            api_key: The X-API-Key the gateway sends to the backends
+            timeout: Seconds each backend gets to answer a query
+            allow_partial: Answer queries from the backends that responded when others fail
+            cooldown: Seconds a backend is skipped after a timeout or error, 0 never skips
+            max_connections: Connections per backend for fanned out queries
+        """
+        if not backends:
+            raise ValueError("A gateway needs at least one backend")
+        self.timeout = timeout
+        self.allow_partial = allow_partial
+        self.cooldown = cooldown
+        self._states = {
+            backend.name: _BackendState(backend, api_key, timeout, max_connections)
+            for backend in backends
+        }
+
+    @property
+    def backends(self) -> List[Backend]:
+        return [state.backend for state in self._states.values()]
+
+    def has(self, name: str) -> bool:
+        return name in self._states
+
+    def _check_available(self, state: _BackendState):
+        remaining = state.down_until - time.monotonic()
+        if remaining > 0:
+            state.counters["skipped"] += 1
+            raise BackendError(f"Skipped for another {remaining:.1f}s after: {state.last_error}")
+
+    def _failed(self, state: _BackendState, error: str, cool_down: bool = True) -> BackendError:
+        state.last_error = error
+        state.counters["failures"] += 1
+        if cool_down and self.cooldown > 0:
+            state.down_until = time.monotonic() + self.cooldown
+        return BackendError(error)
+
+    async def _query(self, state: _BackendState, path: str, params: Optional[Mapping[str, Any]]) -> Any:
+        self._check_available(state)
+        state.counters["requests"] += 1
+        started = time.perf_counter()
+        try:
+            # The client timeout applies to each phase, this bounds the request as a whole
+            response = await asyncio.wait_for(state.client.get(path, params=params), self.timeout)
+        except asyncio.TimeoutError:
+            state.counters["timeouts"] += 1
+            raise self._failed(state, f"Timed out after {self.timeout}s")
+        except httpx.HTTPError as e:
+            raise self._failed(state, f"{type(e).__name__}: {str(e) or 'request failed'}")
+        state.latency_ms = round((time.perf_counter() - started) * 1000, 3)
+
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 400:
+            # Only server errors say something about the health of the backend
+            raise self._failed(
+                state, f"HTTP {response.status_code}: {response.text[:200]}",
+                cool_down=response.status_code >= 500
+            )
+        try:
+            result = response.json()
+        except ValueError:
+            raise self._failed(state, "Response is not JSON")
+        state.down_until = 0.0
+        return result
+
+    async def fan_out(self, path: str, params: Optional[Mapping[str, Any]] = None, strict: bool = True) -> FanOut:
+        """
+        Send a GET request to every backend in parallel and collect the JSON answers.
+
+        Args:
+            path: Path of the request on the backends, e.g. /api/sessions
+            params: Query parameters
+            strict: Apply the partial results policy. Without it the answers are
+                returned whatever failed
+
+        Raises:
+            PartialResults: If strict and backends failed while partial results are
+                not allowed, or no backend answered at all
+        """
+        names = list(self._states)
+        outcomes = await asyncio.gather(
+            *(self._query(self._states[name], path, params) for name in names),
+            return_exceptions=True
+        )
+        results: Dict[str, Any] = {}
+        errors: Dict[str, str] = {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, BackendError):
+                errors[name] = str(outcome)
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results[name] = outcome
+        if strict and errors and (not self.allow_partial or not results):
+            raise PartialResults(errors)
+        return FanOut(results, errors)
+
+    async def proxy(self, name: str, method: str, path: str, params: Mapping[str, Any],
+                    headers: Mapping[str, str], body: bytes,
+                    header_timeout: Optional[float] = None) -> httpx.Response:
+        """
+        Send a request to one backend and return its response as soon as the headers arrived.
+
+        The body is left unread so it can be streamed on, close the response with
+        aclose() when done. A proxied request that times out does not put the backend
+        into cooldown, the backend may simply be slow to answer that one request.
+
+        Args:
+            header_timeout: Seconds the backend gets to send the response headers,
+                defaults to the gateway timeout. Long-polls only answer once they are done
+
+        Raises:
+            KeyError: If there is no backend with this name
+            BackendError: If the backend is cooling down or did not answer in time
+        """
+        state = self._states[name]
+        self._check_available(state)
+        state.counters["proxied"] += 1
+        timeout = self.timeout if header_timeout is None else header_timeout
+        request = state.proxy_client.build_request(method, path, params=params, headers=headers, content=body)
+        try:
+            response = await asyncio.wait_for(state.proxy_client.send(request, stream=True), timeout)
+        except asyncio.TimeoutError:
+            state.counters["timeouts"] += 1
+            raise self._failed(state, f"Timed out after {timeout}s", cool_down=False)
+        except httpx.HTTPError as e:
+            raise self._failed(state, f"{type(e).__name__}: {str(e) or 'request failed'}")
+        if response.status_code >= 500:
+            self._failed(state, f"HTTP {response.status_code}")
+        return response
+
+    async def close(self):
+        for state in self._states.values():
+            await state.client.aclose()
+            await state.proxy_client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            state.backend.name: {
+                "url": state.backend.url,
+                "available": state.down_until <= now,
+                "latency_ms": state.latency_ms,
+                "last_error": state.last_error,
+                **state.counters,
+            }
+            for state in self._states.values()
+        }
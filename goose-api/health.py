@@ -0,0 +1,95 @@
+"""
+Background health probing.
+
+Load balancers and uptime checks call /api/ping several times per second, so
+the checks behind it must not run on every request. A HealthProber checks the
+services in the background every few seconds and keeps the last result, which
+/api/ping returns as it is along with its age.
+
+The checks themselves are cheap: code-server is found by reading
+/proc/<pid>/cmdline (and the PID is remembered, so later checks read a single
+file), and tmux is only asked about the session when its server socket exists.
+"""
+import os
+import subprocess
+import time
+from typing import Any, Dict, Optional
+
+CODE_SERVER = b"code-server"
+
+
+class HealthProber:
+    """Probes the VS Code server and the tmux session and caches the result."""
+
+    def __init__(self, tmux_session: str, interval: float = 5.0):
+        self.tmux_session = tmux_session
+        self.interval = interval
+        self.result: Optional[Dict[str, Any]] = None
+        self.checked_at: Optional[float] = None  # Wall clock time of the last probe
+        self._checked_monotonic = 0.0
+        self._code_server_pid: Optional[int] = None
+
+    @staticmethod
+    def _cmdline(pid: int) -> bytes:
+        try:
+            with open(f"/proc/{pid}/cmdline", 'rb') as f:
+                return f.read()
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            return b""
+
+    def _find_code_server(self) -> Optional[int]:
+        if self._code_server_pid is not None and CODE_SERVER in self._cmdline(self._code_server_pid):
+            return self._code_server_pid
+        self._code_server_pid = None
+        for name in os.listdir("/proc"):
+            if name.isdigit() and int(name) != os.getpid() and CODE_SERVER in self._cmdline(int(name)):
+                self._code_server_pid = int(name)
+                break
+        return self._code_server_pid
+
+    def check_vscode(self) -> Dict[str, str]:
+        try:
+            pid = self._find_code_server()
+        except Exception as e:
+            return {"status": "error", "message": f"Failed to check VS Code: {str(e)}"}
+        if pid is None:
+            return {"status": "error", "message": "VS Code server not detected"}
+        return {"status": "ok", "message": "VS Code server is running"}
+
+    def _tmux_socket(self) -> str:
+        tmp_dir = os.environ.get("TMUX_TMPDIR", "/tmp")
+        return os.path.join(tmp_dir, f"tmux-{os.getuid()}", "default")
+
+    def check_tmux(self) -> Dict[str, str]:
+        try:
+            # Without a server socket no session can exist, so there is no need to run tmux
+            if not os.path.exists(self._tmux_socket()):
+                return {"status": "error", "message": f"Tmux session '{self.tmux_session}' not found"}
+            tmux_check = subprocess.run(
+                ["tmux", "has-session", "-t", self.tmux_session],
+                capture_output=True, timeout=5
+            )
+        except Exception as e:
+            return {"status": "error", "message": f"Failed to check tmux: {str(e)}"}
+        if tmux_check.returncode == 0:
+            return {"status": "ok", "message": f"Tmux session '{self.tmux_session}' is running"}
+        return {"status": "error", "message": f"Tmux session '{self.tmux_session}' not found"}
+
+    def probe(self) -> Dict[str, Any]:
+        """Run all checks now and cache the result."""
+        services = {
+            "api": {"status": "ok", "message": "API is running"},
+            "vscode": self.check_vscode(),
+            "tmux": self.check_tmux(),
+        }
+        status = "ok" if all(s["status"] == "ok" for s in services.values()) else "partial"
+        self.result = {"status": status, "services": services}
+        self.checked_at = time.time()
+        self._checked_monotonic = time.monotonic()
+        return self.result
+
+    def age(self) -> Optional[float]:
+        """Seconds since the last probe, None if there was none yet."""
+        if self.result is None:
+            return None
+        return time.monotonic() - self._checked_monotonic
@@ -0,0 +1,199 @@
+"""
+In-memory snapshots of parsed session history.
+
+Every new stream starts by sending the history of its session. Instead of
+reading and parsing the whole log for each of them, a HistoryCache keeps the
+parsed entries of recently streamed sessions in memory, together with the
+history already serialized as JSON in chunks of whole entries. A snapshot is
+brought up to date by parsing only the lines appended since it was last used,
+so a burst of clients joining the same session costs a single read of the log.
+
+Snapshots are evicted least recently used first once the cache exceeds its
+memory budget.
+"""
+import bisect
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from session_store import SessionStore
+
+# Entries serialized together into one history chunk
+CHUNK_ENTRIES = 64
+# Parsed entries are accounted at this multiple of their size as JSON
+PARSED_OVERHEAD = 2
+
+
+class _Snapshot:
+    """Parsed entries of the log bytes [0, end) of one session."""
+
+    def __init__(self):
+        self.end = 0
+        self.entries: List[Any] = []
+        # Byte range of each entry in the log
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        # JSON of entries [i * CHUNK_ENTRIES, (i + 1) * CHUNK_ENTRIES), joined like json.dumps joins list items
+        self.chunks: List[str] = []
+        self.cost = 0
+        self.lock = threading.Lock()
+
+
+class HistoryCache:
+    """LRU cache of parsed session history, bounded by an approximate memory budget."""
+
+    def __init__(self, store: SessionStore, budget_bytes: int):
+        self.store = store
+        self.budget_bytes = budget_bytes
+        self._snapshots: "OrderedDict[str, _Snapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._counters = {"hits": 0, "misses": 0, "extended": 0, "evicted": 0}
+
+    def _extend(self, session_id: str, snapshot: _Snapshot, end: int):
+        """Parse the complete lines of the log between the snapshot's end and `end`."""
+        data = self.store.read(session_id, snapshot.end, end)
+        data = data[:data.rfind(b"\n") + 1]
+        offset = snapshot.end
+        for raw in data.split(b"\n")[:-1]:
+            line_end = offset + len(raw) + 1
+            if raw.strip():
+                try:
+                    entry = json.loads(raw)
+                except json.JSONDecodeError:
+                    entry = None
+                if entry is not None:
+                    snapshot.entries.append(entry)
+                    snapshot.starts.append(offset)
+                    snapshot.ends.append(line_end)
+                    snapshot.cost += len(raw) * PARSED_OVERHEAD
+                    if len(snapshot.entries) % CHUNK_ENTRIES == 0:
+                        chunk = ", ".join(json.dumps(e) for e in snapshot.entries[-CHUNK_ENTRIES:])
+                        snapshot.chunks.append(chunk)
+                        snapshot.cost += len(chunk)
+            offset = line_end
+        snapshot.end = offset
+
+    def _snapshot(self, session_id: str, end: int) -> _Snapshot:
+        """
+        Get a snapshot covering at least [0, end) and hold its lock.
+
+        Raises:
+            FileNotFoundError: If the session does not exist
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(session_id)
+            if snapshot is not None:
+                self._snapshots.move_to_end(session_id)
+        if snapshot is not None:
+            snapshot.lock.acquire()
+            try:
+                session = self.store.stat(session_id)
+                if session is not None and session.size >= snapshot.end:
+                    if snapshot.end >= end:
+                        self._count("hits")
+                        return snapshot
+                    before = snapshot.cost
+                    self._extend(session_id, snapshot, end)
+                    self._count("extended")
+                    self._account(session_id, snapshot, snapshot.cost - before)
+                    return snapshot
+            except Exception:
+                snapshot.lock.release()
+                raise
+            # The log was rewritten with less content, start over
+            snapshot.lock.release()
+            self.invalidate(session_id)
+
+        snapshot = _Snapshot()
+        snapshot.lock.acquire()
+        try:
+            self._extend(session_id, snapshot, end)
+        except Exception:
+            snapshot.lock.release()
+            raise
+        with self._lock:
+            self._counters["misses"] += 1
+            # Another reader may have built the same snapshot meanwhile, keep the newest
+            previous = self._snapshots.pop(session_id, None)
+            if previous is not None:
+                self._bytes -= previous.cost
+            if snapshot.cost <= self.budget_bytes:
+                self._snapshots[session_id] = snapshot
+                self._bytes += snapshot.cost
+                self._evict()
+        return snapshot
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _account(self, session_id: str, snapshot: _Snapshot, added: int):
+        with self._lock:
+            if self._snapshots.get(session_id) is not snapshot:
+                return
+            self._bytes += added
+            if snapshot.cost > self.budget_bytes:
+                del self._snapshots[session_id]
+                self._bytes -= snapshot.cost
+                self._counters["evicted"] += 1
+            self._evict()
+
+    def _evict(self):
+        while self._bytes > self.budget_bytes and self._snapshots:
+            _, snapshot = self._snapshots.popitem(last=False)
+            self._bytes -= snapshot.cost
+            self._counters["evicted"] += 1
+
+    def invalidate(self, session_id: str):
+        with self._lock:
+            snapshot = self._snapshots.pop(session_id, None)
+            if snapshot is not None:
+                self._bytes -= snapshot.cost
+
+    def entries(self, session_id: str, start: int, end: int) -> List[Any]:
+        """
+        Get the parsed entries of the lines that start in [start, end) of a session log.
+
+        `end` must be the end of a complete line, such as a subscription offset.
+
+        Raises:
+            FileNotFoundError: If the session does not exist
+        """
+        snapshot = self._snapshot(session_id, end)
+        try:
+            first = bisect.bisect_left(snapshot.starts, start)
+            last = bisect.bisect_right(snapshot.ends, end)
+            return snapshot.entries[first:last]
+        finally:
+            snapshot.lock.release()
+
+    def serialized(self, session_id: str, end: int) -> str:
+        """
+        Get the entries of the log bytes [0, end) as a JSON array, like json.dumps would write it.
+
+        Complete chunks are reused as they are, only the entries after the last
+        chunk are serialized.
+
+        Raises:
+            FileNotFoundError: If the session does not exist
+        """
+        snapshot = self._snapshot(session_id, end)
+        try:
+            count = bisect.bisect_right(snapshot.ends, end)
+            full = count // CHUNK_ENTRIES
+            parts = snapshot.chunks[:full]
+            parts.extend(json.dumps(entry) for entry in snapshot.entries[full * CHUNK_ENTRIES:count])
+            return "[" + ", ".join(parts) + "]"
+        finally:
+            snapshot.lock.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._snapshots),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget_bytes,
+                **self._counters,
+            }
@@ -31,7 +31,7 @@ docker exec $CONTAINER_NAME chmod -R +x /workspace/goose-api/examples/
 
 # Install dependencies in the virtual environment
 echo "Installing dependencies in virtual environment..."
-docker exec $CONTAINER_NAME bash -c "export PATH=/opt/goose-api-venv/bin:\$PATH && pip install --upgrade pip && pip install -r /workspace/goose-api/requirements.txt"
+docker exec $CONTAINER_NAME bash -c "export PATH=/opt/goose-api-venv/bin:\$PATH && pip install --upgrade pip && pip install -r /workspace/goose-api/requirements.txt /workspace/goose-api/client"
 
 # Modify entrypoint to start API
 echo "Adding API startup to the container configuration..."
@@ -0,0 +1,51 @@
+"""
+Bounded thread pools for blocking I/O.
+
+Nothing in the API touches the filesystem, SQLite or tmux on the event loop;
+blocking calls run in one of two dedicated pools instead:
+
+- STREAM: short, latency sensitive work that streams wait on, such as tailing
+  logs, stat calls and reading the history of a new stream
+- BULK: heavy work like reading whole logs for GET /api/sessions/{id}, listing,
+  searching, index refreshes and archiving
+
+Keeping them apart means a burst of large reads can only queue up behind each
+other, while stream updates keep flowing through their own threads.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+STREAM = "stream"
+BULK = "bulk"
+
+_sizes: Dict[str, int] = {STREAM: 8, BULK: 4}
+_executors: Dict[str, ThreadPoolExecutor] = {}
+
+
+def configure(stream_threads: int, bulk_threads: int):
+    """Set the pool sizes. Must be called before the first task runs."""
+    _sizes[STREAM] = max(1, stream_threads)
+    _sizes[BULK] = max(1, bulk_threads)
+
+
+def executor(pool: str = STREAM) -> ThreadPoolExecutor:
+    if pool not in _executors:
+        _executors[pool] = ThreadPoolExecutor(max_workers=_sizes[pool], thread_name_prefix=f"goose-io-{pool}")
+    return _executors[pool]
+
+
+async def run(func: Callable, *args: Any, pool: str = STREAM) -> Any:
+    """Run a blocking function in one of the I/O pools and wait for its result."""
+    return await asyncio.get_running_loop().run_in_executor(executor(pool), func, *args)
+
+
+def stats() -> Dict[str, Any]:
+    return {
+        pool: {
+            "threads": _sizes[pool],
+            # Tasks waiting for a free thread
+            "queued": _executors[pool]._work_queue.qsize() if pool in _executors else 0,
+        }
+        for pool in (STREAM, BULK)
+    }
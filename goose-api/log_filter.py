@@ -0,0 +1,168 @@
+"""
+Server-side filtering and projection of session log entries.
+
+Clients usually only need part of a log: some roles, some content types and
+a few fields, with tool output trimmed. A LogFilter applies those choices on
+the server. When filtering by role or content type, raw log lines are first
+checked with a cheap byte pattern, so lines that cannot match are skipped
+without being parsed at all.
+"""
+import json
+import re
+from typing import Any, Iterable, List, Optional
+
+CONTENT_TYPES = ("text", "toolRequest", "toolResponse")
+# Entries without a role (the session description at the top of each log)
+METADATA_ROLE = "metadata"
+
+
+def split_list(value: Optional[str]) -> Optional[List[str]]:
+    """Parse a comma separated query parameter, None if it is empty."""
+    if not value:
+        return None
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    return items or None
+
+
+def _truncate_text(text: str, max_bytes: int) -> Optional[str]:
+    """The text cut to at most max_bytes of UTF-8, None if it already fits."""
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return None
+    return encoded[:max_bytes].decode("utf-8", errors="ignore")
+
+
+class LogFilter:
+    """
+    Filter and projection for log entries.
+
+    Args:
+        roles: Keep only messages with these roles ('metadata' keeps the session description)
+        content_types: Keep only these content items (text, toolRequest, toolResponse),
+            messages left without content are dropped
+        fields: Keep only these top-level message fields
+        audience: Keep only toolResponse parts meant for this audience ('user' or 'assistant')
+        truncate: Cut text in tool responses to this many bytes
+    """
+
+    def __init__(self, roles: Optional[Iterable[str]] = None, content_types: Optional[Iterable[str]] = None,
+                 fields: Optional[Iterable[str]] = None, audience: Optional[str] = None,
+                 truncate: Optional[int] = None):
+        self.roles = set(roles) if roles else None
+        self.content_types = set(content_types) if content_types else None
+        self.fields = list(fields) if fields else None
+        self.audience = audience
+        self.truncate = truncate
+
+        unknown = (self.content_types or set()) - set(CONTENT_TYPES)
+        if unknown:
+            raise ValueError(f"Unknown content types: {', '.join(sorted(unknown))}")
+        if truncate is not None and truncate < 0:
+            raise ValueError("truncate must not be negative")
+
+        # Byte patterns one of which must occur in a raw line for it to possibly match
+        self._role_pattern = None
+        if self.roles is not None and METADATA_ROLE not in self.roles:
+            alternatives = b"|".join(re.escape(role.encode("utf-8")) for role in self.roles)
+            self._role_pattern = re.compile(rb'"role"\s*:\s*"(?:' + alternatives + rb')"')
+        self._type_pattern = None
+        if self.content_types is not None:
+            alternatives = b"|".join(t.encode("utf-8") for t in self.content_types)
+            pattern = rb'"type"\s*:\s*"(?:' + alternatives + rb')"'
+            if "text" in self.content_types:
+                # Older logs wrap text as {"Text": {"text": ...}}
+                pattern += rb'|"Text"'
+            self._type_pattern = re.compile(pattern)
+
+    @property
+    def active(self) -> bool:
+        return any(v is not None for v in (self.roles, self.content_types, self.fields, self.audience, self.truncate))
+
+    def prefilter(self, raw: bytes) -> bool:
+        """Cheap check on an unparsed line. False means the entry is certainly filtered out."""
+        if self._role_pattern is not None and not self._role_pattern.search(raw):
+            return False
+        if self._type_pattern is not None and not self._type_pattern.search(raw):
+            return False
+        return True
+
+    def apply(self, entry: Any) -> Optional[Any]:
+        """
+        Filter and project one parsed entry.
+
+        Returns:
+            The projected entry (the original is not modified), None if it is filtered out.
+        """
+        if not self.active:
+            return entry
+        if not isinstance(entry, dict):
+            return None
+
+        wrapped = isinstance(entry.get("data"), dict)
+        message = entry["data"] if wrapped else entry
+        role = message.get("role") or METADATA_ROLE
+
+        if self.roles is not None and role not in self.roles:
+            return None
+        if role == METADATA_ROLE and self.content_types is not None:
+            return None
+
+        content = message.get("content")
+        if isinstance(content, list) and (self.content_types is not None or self.audience or self.truncate is not None):
+            items = []
+            for item in content:
+                item = self._filter_item(item)
+                if item is not None:
+                    items.append(item)
+            if not items and self.content_types is not None:
+                return None
+            message = dict(message, content=items)
+
+        if self.fields is not None:
+            message = {field: message[field] for field in self.fields if field in message}
+
+        if wrapped:
+            return dict(entry, data=message)
+        return message
+
+    def _filter_item(self, item: Any) -> Optional[Any]:
+        if not isinstance(item, dict):
+            return item
+        item_type = item.get("type") or ("text" if "Text" in item else None)
+        if self.content_types is not None and item_type not in self.content_types:
+            return None
+        if item_type != "toolResponse" or not (self.audience or self.truncate is not None):
+            return item
+
+        result = item.get("toolResult")
+        if not isinstance(result, dict) or not isinstance(result.get("value"), list):
+            return item
+        parts = []
+        for part in result["value"]:
+            if not isinstance(part, dict):
+                parts.append(part)
+                continue
+            audience = (part.get("annotations") or {}).get("audience")
+            if self.audience and audience and self.audience not in audience:
+                continue
+            if self.truncate is not None and isinstance(part.get("text"), str):
+                truncated = _truncate_text(part["text"], self.truncate)
+                if truncated is not None:
+                    part = dict(part, text=truncated, truncated=True)
+            parts.append(part)
+        return dict(item, toolResult=dict(result, value=parts))
+
+    def filter_lines(self, content: bytes) -> List[Any]:
+        """Parse and filter the JSON lines of a log, skipping lines that cannot match before parsing them."""
+        entries = []
+        for line in content.splitlines():
+            if not line.strip() or not self.prefilter(line):
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            entry = self.apply(entry)
+            if entry is not None:
+                entries.append(entry)
+        return entries
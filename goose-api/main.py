@@ -1,15 +1,32 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header, Security
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Header, Request, Security, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.security import APIKeyHeader
+from starlette.background import BackgroundTask
+from starlette.requests import HTTPConnection
 from pydantic import BaseModel
 import subprocess
 import os
 import json
+import io
 import time
-from typing import List, Optional, Dict, Any, AsyncGenerator
-import glob
+from typing import List, Optional, Dict, Any, AsyncGenerator, Tuple
 import asyncio
+import fnmatch
+
+from health import HealthProber
+from history_cache import HistoryCache
+import io_pool
+from log_filter import LogFilter, split_list
+from session_index import SessionIndex
+from session_store import CHUNK_SIZE, RestoreConflict, SessionFile, SessionStore
+from single_flight import SingleFlight
+from tail_hub import CATALOG, CatalogEvent, Subscription, SUBSCRIBER_QUEUE_SIZE, TailEvent, TailHub, parse_line
+from admission import AdmissionController, Policy, Rejected, Ticket
+import broker
+from broker import RemoteTailHub
+from gateway import BackendError, Gateway, PartialResults, parse_backends
 
 # Load password from environment variable
 API_PASSWORD = os.environ.get("PASSWORD", "talktomegoose")
@@ -29,6 +46,44 @@ async def verify_api_key(api_key: str = Security(API_KEY_HEADER)):
         raise HTTPException(status_code=403, detail="Invalid API Key")
     return api_key
 
+def client_id(connection: HTTPConnection) -> str:
+    """
+    Tell clients apart by their address. A trusted proxy, such as a gateway, can pass
+    on the client it forwards for in the X-Client-ID header.
+    """
+    address = connection.client.host if connection.client else "unknown"
+    if address in TRUSTED_PROXIES:
+        return connection.headers.get("x-client-id") or address
+    return address
+
+async def admission_key(http_request: Request, api_key: str = Depends(verify_api_key)) -> str:
+    """The key admission limits are applied per: the API key and the client that uses it."""
+    return f"{api_key}:{client_id(http_request)}"
+
+async def admit(endpoint: str, key: str) -> Ticket:
+    """Admit a request of an endpoint class, or fail it with 429 and a Retry-After header."""
+    try:
+        return await admission.acquire(endpoint, key)
+    except Rejected as e:
+        raise HTTPException(status_code=429, detail=e.reason, headers={"Retry-After": e.retry_after_header})
+
+def admitted_stream(generator: AsyncGenerator[str, None], *tickets: Optional[Ticket]) -> StreamingResponse:
+    """Stream SSE events from a generator, releasing the admission tickets when the stream ends."""
+    def release():
+        for ticket in tickets:
+            if ticket is not None:
+                ticket.release()
+    
+    async def events():
+        try:
+            async for event in generator:
+                yield event
+        finally:
+            release()
+    
+    # The background task also covers a client that disconnects before the stream starts
+    return StreamingResponse(events(), media_type="text/event-stream", background=BackgroundTask(release))
+
 # Enable CORS for local development
 app.add_middleware(
     CORSMiddleware,
@@ -39,11 +94,95 @@ app.add_middleware(
 )
 
 # Path where Goose session logs are stored
-LOGS_PATH = "/home/coder/.local/share/goose/sessions"
+LOGS_PATH = os.environ.get("GOOSE_LOGS_PATH", "/home/coder/.local/share/goose/sessions")
+# Where idle sessions are moved as seekable compressed archives, and the cold storage policies
+ARCHIVE_PATH = os.environ.get("GOOSE_API_ARCHIVE_PATH", f"{LOGS_PATH}/archive")
+ARCHIVE_AFTER_SECONDS = float(os.environ.get("GOOSE_API_ARCHIVE_AFTER", "0"))  # 0 disables archiving
+ARCHIVE_RETENTION_DAYS = float(os.environ.get("GOOSE_API_ARCHIVE_RETENTION_DAYS", "0"))  # 0 keeps archives forever
+ARCHIVE_BUDGET_MB = float(os.environ.get("GOOSE_API_ARCHIVE_BUDGET_MB", "0"))  # 0 means no size limit
+ARCHIVE_INTERVAL = float(os.environ.get("GOOSE_API_ARCHIVE_INTERVAL", "3600"))
+# Number of uvicorn worker processes. With more than one, a broker process owns the
+# log tailers and background jobs and serves the workers over a Unix socket
+WORKERS = int(os.environ.get("GOOSE_API_WORKERS", "1"))
+BROKER_SOCKET = os.environ.get("GOOSE_API_BROKER_SOCKET", "/tmp/goose-api-broker.sock")
+# Set by the launcher for worker processes, which then get their events from the broker
+USE_BROKER = os.environ.get("GOOSE_API_USE_BROKER") == "1"
+# How often session tailers check their log for appended entries
+TAIL_POLL_INTERVAL = float(os.environ.get("GOOSE_API_TAIL_INTERVAL", "0.5"))
+# Admission control per client: concurrent requests, admitted requests per second and burst size,
+# and concurrent requests of all clients together (0 disables a limit)
+STREAM_CONCURRENCY = int(os.environ.get("GOOSE_API_STREAM_CONCURRENCY", "32"))
+STREAM_RATE = float(os.environ.get("GOOSE_API_STREAM_RATE", "10"))
+STREAM_BURST = int(os.environ.get("GOOSE_API_STREAM_BURST", "50"))
+STREAM_TOTAL = int(os.environ.get("GOOSE_API_STREAM_TOTAL", "512"))
+COMMAND_CONCURRENCY = int(os.environ.get("GOOSE_API_COMMAND_CONCURRENCY", "4"))
+COMMAND_RATE = float(os.environ.get("GOOSE_API_COMMAND_RATE", "10"))
+COMMAND_BURST = int(os.environ.get("GOOSE_API_COMMAND_BURST", "50"))
+COMMAND_TOTAL = int(os.environ.get("GOOSE_API_COMMAND_TOTAL", "8"))
+# Long-polls on /changes that wait, they are cheap and meant to be made at a high rate
+POLL_CONCURRENCY = int(os.environ.get("GOOSE_API_POLL_CONCURRENCY", "256"))
+POLL_RATE = float(os.environ.get("GOOSE_API_POLL_RATE", "0"))
+POLL_BURST = int(os.environ.get("GOOSE_API_POLL_BURST", "0"))
+POLL_TOTAL = int(os.environ.get("GOOSE_API_POLL_TOTAL", "4096"))
+# Addresses of proxies, such as a gateway, whose X-Client-ID header is trusted to tell their clients apart
+TRUSTED_PROXIES = set(split_list(os.environ.get("GOOSE_API_TRUSTED_PROXIES", "")) or [])
+# Seconds a request over the concurrency limit waits for a free slot before it is rejected
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get("GOOSE_API_ADMISSION_QUEUE_TIMEOUT", "2"))
+
+# Seconds between background health probes
+HEALTH_INTERVAL = float(os.environ.get("GOOSE_API_HEALTH_INTERVAL", "5"))
+
+# Threads for short, latency sensitive I/O (tailing, stat calls, stream history) and for heavy reads
+IO_THREADS = int(os.environ.get("GOOSE_API_IO_THREADS", "8"))
+BULK_IO_THREADS = int(os.environ.get("GOOSE_API_BULK_IO_THREADS", "4"))
+
+# Memory budget for parsed session history kept for new streams, 0 disables the cache
+HISTORY_CACHE_MB = float(os.environ.get("GOOSE_API_HISTORY_CACHE_MB", "64"))
+
+# Path of the persistent search index and how often it picks up appended log data
+INDEX_PATH = os.environ.get("GOOSE_API_INDEX_PATH", "/home/coder/.local/share/goose-api/index.sqlite3")
+INDEX_REFRESH_INTERVAL = float(os.environ.get("GOOSE_API_INDEX_INTERVAL", "2.0"))
+
+# Gateway mode: serve the merged sessions of these goose-api instances instead of local ones.
+# A comma separated list of name=url entries, empty runs a regular API
+GATEWAY_BACKENDS = os.environ.get("GOOSE_API_GATEWAY_BACKENDS", "")
+# API key the gateway sends to its backends
+GATEWAY_BACKEND_KEY = os.environ.get("GOOSE_API_GATEWAY_BACKEND_KEY", API_PASSWORD)
+# Seconds each backend gets to answer, and seconds a failed backend is skipped (0 never skips)
+GATEWAY_TIMEOUT = float(os.environ.get("GOOSE_API_GATEWAY_TIMEOUT", "5"))
+GATEWAY_COOLDOWN = float(os.environ.get("GOOSE_API_GATEWAY_COOLDOWN", "10"))
+# "allow" answers from the backends that responded, "fail" fails the request if any backend did not
+GATEWAY_PARTIAL = os.environ.get("GOOSE_API_GATEWAY_PARTIAL", "allow")
+# Pooled keep-alive connections per backend for fanned out queries
+GATEWAY_MAX_CONNECTIONS = int(os.environ.get("GOOSE_API_GATEWAY_MAX_CONNECTIONS", "20"))
+
+# Port the API listens on
+PORT = int(os.environ.get("GOOSE_API_PORT", "8000"))
+
 # Default tmux session details
 DEFAULT_SESSION = "goose-controller"
 DEFAULT_WINDOW = "goose"
 
+io_pool.configure(IO_THREADS, BULK_IO_THREADS)
+session_store = SessionStore(LOGS_PATH, ARCHIVE_PATH)
+session_index = SessionIndex(session_store, INDEX_PATH)
+history_cache = HistoryCache(session_store, int(HISTORY_CACHE_MB * 1024 * 1024))
+# Shared in-flight reads of GET /api/sessions and GET /api/sessions/{session_id}
+read_flights = SingleFlight()
+tail_hub = RemoteTailHub(BROKER_SOCKET) if USE_BROKER else TailHub(session_store, TAIL_POLL_INTERVAL)
+health_prober = HealthProber(DEFAULT_SESSION, HEALTH_INTERVAL)
+admission = AdmissionController({
+    "stream": Policy(STREAM_CONCURRENCY, STREAM_RATE, STREAM_BURST, ADMISSION_QUEUE_TIMEOUT, STREAM_TOTAL),
+    "command": Policy(COMMAND_CONCURRENCY, COMMAND_RATE, COMMAND_BURST, ADMISSION_QUEUE_TIMEOUT, COMMAND_TOTAL),
+    "poll": Policy(POLL_CONCURRENCY, POLL_RATE, POLL_BURST, ADMISSION_QUEUE_TIMEOUT, POLL_TOTAL),
+})
+if GATEWAY_PARTIAL not in ("allow", "fail"):
+    raise ValueError(f"GOOSE_API_GATEWAY_PARTIAL must be 'allow' or 'fail', not '{GATEWAY_PARTIAL}'")
+gateway = Gateway(
+    parse_backends(GATEWAY_BACKENDS), GATEWAY_BACKEND_KEY, GATEWAY_TIMEOUT,
+    GATEWAY_PARTIAL == "allow", GATEWAY_COOLDOWN, GATEWAY_MAX_CONNECTIONS
+) if GATEWAY_BACKENDS else None
+
 # --- Models ---
 
 class TerminalCommand(BaseModel):
@@ -58,6 +197,28 @@ class SessionInfo(BaseModel):
     file_path: str
     size_bytes: int
     last_modified: float
+    # Summary fields, only filled in when requested with ?summary=true
+    message_count: Optional[int] = None
+    tool_calls: Optional[Dict[str, int]] = None
+    first_timestamp: Optional[float] = None
+    last_timestamp: Optional[float] = None
+    output_bytes: Optional[int] = None
+    archived: bool = False  # Compressed in the archive, size_bytes and last_modified are those of the original log
+    stored_bytes: Optional[int] = None  # Size on disk
+
+class SessionStats(BaseModel):
+    """Model for the analytics summary of a session"""
+    session_id: str
+    size_bytes: int
+    last_modified: float
+    message_count: int
+    user_messages: int
+    assistant_messages: int
+    tool_calls: Dict[str, int]
+    first_timestamp: Optional[float] = None
+    last_timestamp: Optional[float] = None
+    turn_durations: List[float]
+    output_bytes: int
 
 class LogEntry(BaseModel):
     """Model for a log entry (generic to handle various formats)"""
@@ -69,6 +230,34 @@ class SessionLog(BaseModel):
     session_id: str
     entries: List[LogEntry]
 
+class ChangedEntry(BaseModel):
+    """Model for an entry returned by the changes endpoint"""
+    offset: int  # Byte offset of the entry in the session log
+    end: int  # Byte offset just past the entry
+    entry: Any
+
+class SessionChanges(BaseModel):
+    """Model for the entries appended to a session since an offset"""
+    session_id: str
+    since: int
+    next_offset: int  # Pass as `since` in the next request
+    entries: List[ChangedEntry]
+
+class SearchHit(BaseModel):
+    """Model for a single full-text search hit"""
+    session_id: str
+    offset: int  # Byte offset of the entry in the session log
+    line: int  # Line number of the entry, matches its index in get_session_log entries
+    role: str
+    score: float
+    snippet: str
+
+class SearchResults(BaseModel):
+    """Model for full-text search results"""
+    query: str
+    hits: List[SearchHit]
+    took_ms: float
+
 # --- SSE Endpoint ---
 
 class StreamRequest(BaseModel):
@@ -80,6 +269,72 @@ class StreamRequest(BaseModel):
     poll_interval: float = 0.5  # How often to check for updates
     timeout_seconds: int = 300  # Inactivity timeout
     wait_for_response: bool = True  # Wait for assistant response before disconnecting
+    # Server-side filtering and projection of the streamed entries
+    roles: Optional[List[str]] = None  # e.g. ["user", "assistant"], "metadata" for the session description
+    content_types: Optional[List[str]] = None  # Any of "text", "toolRequest", "toolResponse"
+    fields: Optional[List[str]] = None  # Top-level message fields to keep, e.g. ["role", "content"]
+    audience: Optional[str] = None  # Keep only tool output parts meant for this audience, e.g. "user"
+    truncate: Optional[int] = None  # Cut tool output text to this many bytes
+    # Resume from this byte offset, the `end` of the last event received, instead of sending initial_state
+    since: Optional[int] = None
+
+def list_session_files() -> List[SessionFile]:
+    """List all sessions, using the index snapshot to skip reading unchanged archives."""
+    try:
+        known = session_index.catalog()
+    except Exception as e:
+        print(f"Session catalog unavailable: {str(e)}")
+        known = None
+    return session_store.list(known)
+
+def find_message_in_recent_sessions(command: str, modified_since: float) -> Optional[str]:
+    """Look for a user message in the 5 most recently modified sessions, returning the session ID."""
+    # Sessions the index already knows the message in
+    try:
+        session_id = session_index.find_user_message(command, modified_since)
+        if session_id:
+            return session_id
+    except Exception as e:
+        print(f"User message lookup failed: {str(e)}")
+    
+    # Get the sessions written to since the message was sent
+    sessions = [s for s in list_session_files() if s.mtime >= modified_since]
+    
+    # Sort sessions by last modified time (newest first)
+    sessions.sort(key=lambda x: x.mtime, reverse=True)
+    
+    # Check the most recent sessions first (limit to 5 most recent)
+    for session in sessions[:5]:
+        try:
+            for line in session_store.read(session.session_id).splitlines():
+                try:
+                    entry_json = json.loads(line)
+                    
+                    # Handle the structure where message is inside 'data' field
+                    if "data" in entry_json:
+                        entry = entry_json["data"]
+                    else:
+                        entry = entry_json
+                    
+                    # Check if this is a user message
+                    if entry.get("role") == "user" and "content" in entry:
+                        content_list = entry["content"]
+                        
+                        # Check for matching message in content
+                        if isinstance(content_list, list):
+                            for content_item in content_list:
+                                # Handle different content formats
+                                if "Text" in content_item and content_item["Text"].get("text") == command:
+                                    return session.session_id
+                                elif content_item.get("type") == "text" and content_item.get("text") == command:
+                                    return session.session_id
+                except json.JSONDecodeError:
+                    continue
+        except Exception as e:
+            print(f"Error processing session {session.session_id}: {str(e)}")
+            continue
+    
+    return None
 
 async def find_session_for_message(command: str, max_wait_time: int = 10) -> Optional[str]:
     """
@@ -96,65 +351,56 @@ async def find_session_for_message(command: str, max_wait_time: int = 10) -> Opt
     start_time = time.time()
     
     while time.time() - start_time < max_wait_time:
-        # Get all available sessions
-        sessions = []
-        for file_path in glob.glob(f"{LOGS_PATH}/*.jsonl"):
-            file_name = os.path.basename(file_path)
-            session_id = file_name.split('.')[0]
-            stats = os.stat(file_path)
-            
-            sessions.append({
-                "session_id": session_id,
-                "file_path": file_path,
-                "last_modified": stats.st_mtime
-            })
-        
-        # Sort sessions by last modified time (newest first)
-        sessions.sort(key=lambda x: x["last_modified"], reverse=True)
-        
-        # Check the most recent sessions first (limit to 5 most recent)
-        for session in sessions[:5]:
-            log_path = session["file_path"]
-            try:
-                with open(log_path, 'r') as f:
-                    for line in f:
-                        try:
-                            entry_json = json.loads(line)
-                            
-                            # Handle the structure where message is inside 'data' field
-                            if "data" in entry_json:
-                                entry = entry_json["data"]
-                            else:
-                                entry = entry_json
-                            
-                            # Check if this is a user message
-                            if entry.get("role") == "user" and "content" in entry:
-                                content_list = entry["content"]
-                                
-                                # Check for matching message in content
-                                if isinstance(content_list, list):
-                                    for content_item in content_list:
-                                        # Handle different content formats
-                                        if "Text" in content_item and content_item["Text"].get("text") == command:
-                                            return session["session_id"]
-                                        elif content_item.get("type") == "text" and content_item.get("text") == command:
-                                            return session["session_id"]
-                        except json.JSONDecodeError:
-                            continue
-            except Exception as e:
-                print(f"Error processing session {session['session_id']}: {str(e)}")
-                continue
+        # Allow for coarse file timestamps
+        session_id = await io_pool.run(find_message_in_recent_sessions, command, start_time - 2)
+        if session_id:
+            return session_id
         
         # Wait before polling again
         await asyncio.sleep(0.5)
     
     return None
 
-async def sse_generator(stream_request: StreamRequest) -> AsyncGenerator[str, None]:
+def send_tmux_keys(command: str, session: str, window: str):
+    """Type a command into a tmux window and press enter. Raises CalledProcessError on failure."""
+    escaped_command = command.replace("'", "'\\''")
+    tmux_cmd = f"tmux send-keys -t '{session}:{window}' '{escaped_command}' C-m"
+    subprocess.run(tmux_cmd, shell=True, check=True, capture_output=True)
+
+def is_assistant_text(entry: Dict[str, Any]) -> bool:
+    """Check whether a log entry is an assistant message with text content."""
+    # Check if this is an assistant message
+    role = None
+    if "data" in entry and "role" in entry["data"]:
+        role = entry["data"]["role"]
+    elif "role" in entry:
+        role = entry["role"]
+    
+    if role != "assistant":
+        return False
+    
+    # Check if it contains text content
+    content = None
+    if "data" in entry and "content" in entry["data"]:
+        content = entry["data"]["content"]
+    elif "content" in entry:
+        content = entry["content"]
+    
+    if content and isinstance(content, list):
+        for item in content:
+            if (item.get("type") == "text" and "text" in item) or \
+               ("Text" in item and "text" in item["Text"]):
+                return True
+    return False
+
+async def sse_generator(stream_request: StreamRequest, log_filter: LogFilter,
+                        command_ticket: Optional[Ticket] = None) -> AsyncGenerator[str, None]:
     """
     Generator for SSE events from Goose session logs.
     Handles session identification, command sending, and log streaming.
     Automatically ends the stream after receiving an assistant response.
+    Entries are filtered and projected by log_filter before they are sent.
+    The command admission ticket is released as soon as the command was sent.
     """
     session_id = stream_request.session_id
     command = stream_request.command
@@ -163,9 +409,11 @@ async def sse_generator(stream_request: StreamRequest) -> AsyncGenerator[str, No
     if command and not session_id:
         try:
             # Send command to terminal
-            escaped_command = command.replace("'", "'\\''")
-            tmux_cmd = f"tmux send-keys -t '{stream_request.tmux_session}:{stream_request.tmux_window}' '{escaped_command}' C-m"
-            subprocess.run(tmux_cmd, shell=True, check=True)
+            try:
+                await io_pool.run(send_tmux_keys, command, stream_request.tmux_session, stream_request.tmux_window)
+            finally:
+                if command_ticket is not None:
+                    command_ticket.release()
             
             # Notify that command was sent
             yield f"event: command_sent\ndata: {json.dumps({'command': command})}\n\n"
@@ -185,9 +433,11 @@ async def sse_generator(stream_request: StreamRequest) -> AsyncGenerator[str, No
     elif command and session_id:
         try:
             # Send command to terminal
-            escaped_command = command.replace("'", "'\\''")
-            tmux_cmd = f"tmux send-keys -t '{stream_request.tmux_session}:{stream_request.tmux_window}' '{escaped_command}' C-m"
-            subprocess.run(tmux_cmd, shell=True, check=True)
+            try:
+                await io_pool.run(send_tmux_keys, command, stream_request.tmux_session, stream_request.tmux_window)
+            finally:
+                if command_ticket is not None:
+                    command_ticket.release()
             
             # Notify that command was sent
             yield f"event: command_sent\ndata: {json.dumps({'command': command})}\n\n"
@@ -200,180 +450,547 @@ async def sse_generator(stream_request: StreamRequest) -> AsyncGenerator[str, No
         yield f"event: error\ndata: {json.dumps({'error': 'No session ID provided or found'})}\n\n"
         return
     
-    # Verify session log file exists
-    log_path = f"{LOGS_PATH}/{session_id}.jsonl"
-    if not os.path.exists(log_path):
-        yield f"event: error\ndata: {json.dumps({'error': f'Session log file not found: {session_id}'})}\n\n"
-        return
-    
-    # Send initial state of the conversation
-    last_position = 0
-    assistant_responded = False
-    
+    # Follow the session through the shared tail hub, history up to the subscription offset comes from the history cache
     try:
-        with open(log_path, 'r') as f:
-            content = f.read()
-            last_position = len(content)
-            entries = []
-            for line in content.splitlines():
-                if line.strip():
-                    try:
-                        entry = json.loads(line)
-                        entries.append(entry)
-                    except json.JSONDecodeError:
-                        continue
-            
-            if entries:
-                yield f"event: initial_state\ndata: {json.dumps({'entries': entries})}\n\n"
+        subscription = await tail_hub.subscribe(session_id)
     except Exception as e:
-        yield f"event: error\ndata: {json.dumps({'error': f'Error reading log file: {str(e)}'})}\n\n"
+        # e.g. the broker cannot be reached in multi-worker mode
+        print(f"Stream error: {str(e)}")
+        yield f"event: error\ndata: {json.dumps({'error': f'Could not follow session {session_id}: {str(e)}'})}\n\n"
+        return
+    if subscription is None:
+        yield f"event: error\ndata: {json.dumps({'error': f'Session log file not found: {session_id}'})}\n\n"
         return
     
-    # Monitor for new entries until assistant responds
     try:
-        # Poll until we get an assistant response, then close the stream
-        while not assistant_responded:
-            if os.path.exists(log_path):
-                stats = os.stat(log_path)
-                if stats.st_size > last_position:
-                    with open(log_path, 'r') as f:
-                        f.seek(last_position)
-                        new_content = f.read()
-                        last_position = f.tell()
-                        
-                        for line in new_content.splitlines():
-                            if line.strip():
-                                try:
-                                    entry = json.loads(line)
-                                    yield f"event: update\ndata: {json.dumps({'entry': entry})}\n\n"
-                                    
-                                    # Check if this is an assistant message
-                                    role = None
-                                    if "data" in entry and "role" in entry["data"]:
-                                        role = entry["data"]["role"]
-                                    elif "role" in entry:
-                                        role = entry["role"]
-                                    
-                                    # If this is an assistant message with text content, end the stream
-                                    if role == "assistant":
-                                        # Check if it contains text content
-                                        has_text_content = False
-                                        content = None
-                                        
-                                        if "data" in entry and "content" in entry["data"]:
-                                            content = entry["data"]["content"]
-                                        elif "content" in entry:
-                                            content = entry["content"]
-                                        
-                                        if content and isinstance(content, list):
-                                            for item in content:
-                                                if (item.get("type") == "text" and "text" in item) or \
-                                                   ("Text" in item and "text" in item["Text"]):
-                                                    has_text_content = True
-                                                    break
-                                        
-                                        if has_text_content:
-                                            assistant_responded = True
-                                            # Send a conversation complete event
-                                            yield f"event: conversation_complete\ndata: {json.dumps({'session_id': session_id, 'message': 'Assistant response received'})}\n\n"
-                                            # Stream will be closed after this
-                                            return
-                                except json.JSONDecodeError:
-                                    continue
+        backlog: List[TailEvent] = []
+        if stream_request.since is None:
+            # Send initial state of the conversation
+            try:
+                if log_filter.active:
+                    entries = await io_pool.run(history_cache.entries, session_id, 0, subscription.offset)
+                    entries = [entry for entry in map(log_filter.apply, entries) if entry is not None]
+                    serialized = json.dumps(entries)
+                else:
+                    serialized = await io_pool.run(history_cache.serialized, session_id, subscription.offset)
             
-            # Quick ping to keep the connection alive while waiting
-            yield f"event: ping\ndata: {json.dumps({'timestamp': time.time()})}\n\n"
+                if serialized != "[]":
+                    yield f"event: initial_state\ndata: {{\"entries\": {serialized}, \"end\": {subscription.offset}}}\n\n"
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'error': f'Error reading log file: {str(e)}'})}\n\n"
+                return
+        else:
+            # A resumed stream gets the entries it missed as updates, instead of the whole history
+            try:
+                backlog = await io_pool.run(
+                    read_entries_since, session_id, min(stream_request.since, subscription.offset), subscription.offset
+                )
+            except Exception as e:
+                yield f"event: error\ndata: {json.dumps({'error': f'Error reading log file: {str(e)}'})}\n\n"
+                return
+        
+        # Monitor for new entries until assistant responds, then close the stream
+        backlog.reverse()
+        while True:
+            event = backlog.pop() if backlog else await subscription.next(timeout=0.5)
+            if event is None:
+                if subscription.closed:
+                    yield f"event: error\ndata: {json.dumps({'error': subscription.error or 'Stream closed'})}\n\n"
+                    return
+                # Quick ping to keep the connection alive while waiting
+                yield f"event: ping\ndata: {json.dumps({'timestamp': time.time()})}\n\n"
+                continue
             
-            # Short delay before checking again
-            await asyncio.sleep(0.5)
+            entry = event.entry
+            if entry is None:
+                continue
+            projected = log_filter.apply(entry)
+            if projected is not None:
+                yield f"event: update\ndata: {json.dumps({'entry': projected, 'end': event.end})}\n\n"
             
+            # If this is an assistant message with text content, end the stream
+            if is_assistant_text(entry):
+                # Send a conversation complete event
+                yield f"event: conversation_complete\ndata: {json.dumps({'session_id': session_id, 'message': 'Assistant response received'})}\n\n"
+                # Stream will be closed after this
+                return
     except Exception as e:
         error_msg = str(e)
         print(f"Stream error: {error_msg}")
         yield f"event: error\ndata: {json.dumps({'error': error_msg})}\n\n"
+    finally:
+        tail_hub.unsubscribe(subscription)
 
 @app.post("/api/stream", summary="Stream Goose session updates using Server-Sent Events (SSE)", dependencies=[Depends(verify_api_key)])
-async def stream_session(request: StreamRequest):
+async def stream_session(request: StreamRequest, client: str = Depends(admission_key)):
     """
     Stream Goose session updates and automatically close after receiving assistant response.
+    
+    Set roles, content_types, fields, audience and truncate to filter and project the
+    streamed entries on the server. The stream still closes on the assistant response
+    even if that entry itself is filtered out.
+    
+    Streams and commands are subject to admission control, requests over the limits
+    get a 429 response with a Retry-After header.
     """
-    return StreamingResponse(
-        sse_generator(request),
-        media_type="text/event-stream"
-    )
+    try:
+        log_filter = LogFilter(request.roles, request.content_types, request.fields, request.audience, request.truncate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    ticket = await admit("stream", client)
+    command_ticket = None
+    if request.command:
+        try:
+            command_ticket = await admit("command", client)
+        except HTTPException:
+            ticket.release()
+            raise
+    
+    return admitted_stream(sse_generator(request, log_filter, command_ticket), ticket, command_ticket)
 
-# --- Health Check Endpoint ---
+# --- Firehose Endpoint ---
 
-@app.get("/api/ping", summary="Health check endpoint", dependencies=[Depends(verify_api_key)])
-async def ping():
+class FirehoseRequest(BaseModel):
+    """Model for multi-session streaming requests"""
+    session_ids: Optional[List[str]] = None  # Explicit sessions to follow
+    pattern: Optional[str] = None  # Glob over session IDs, e.g. "20250308_*"
+    all: bool = False  # Follow every session
+    # For pattern/all: only follow sessions written to this recently, idle ones are
+    # dropped and picked up again as soon as they change
+    active_within: float = 3600
+    # Resume sessions from these byte offsets, the `end` of the last update received for them.
+    # Entries written since are sent before the live updates
+    offsets: Optional[Dict[str, int]] = None
+
+def read_entries_since(session_id: str, position: int, end: int) -> List[TailEvent]:
     """
-    Comprehensive health check endpoint that verifies:
-    1. The API itself is running
-    2. The VS Code server is accessible
-    3. The tmux session has been started
+    Read the complete entries of a log that end after `position` and before `end`.
     
-    Returns a JSON response with detailed status information.
+    `position` does not have to be at a line boundary, the entry it falls into is included.
     """
-    status = "ok"
-    services = {
-        "api": {"status": "ok", "message": "API is running"},
-        "vscode": {"status": "unknown", "message": "Not checked"},
-        "tmux": {"status": "unknown", "message": "Not checked"}
-    }
+    start = max(0, position - 64 * 1024)
+    data = session_store.read(session_id, start, end)
+    newline = data.rfind(b"\n", 0, position - start)
+    if newline != -1:
+        start, data = start + newline + 1, data[newline + 1:]
+    elif start > 0:
+        # The line is longer than the look-behind window, it starts at an unknown position
+        skip = data.find(b"\n", position - start)
+        if skip == -1:
+            return []
+        start, data = start + skip + 1, data[skip + 1:]
+    
+    events = []
+    offset = start
+    for raw in data.split(b"\n")[:-1]:
+        line_end = offset + len(raw) + 1
+        if raw.strip():
+            line = raw.decode("utf-8", errors="replace")
+            events.append(TailEvent(session_id, offset, line_end, line, parse_line(line)))
+        offset = line_end
+    return events
+
+async def firehose_generator(request: FirehoseRequest) -> AsyncGenerator[str, None]:
+    """
+    Generator for SSE events from many sessions at once.
     
-    # Check if VS Code server is running (port 8080)
+    All followed sessions and the directory watcher deliver into one queue, and
+    every log is tailed once by the shared tail hub no matter how many streams follow it.
+    """
+    explicit = set(request.session_ids or [])
+    resume_offsets = request.offsets or {}
+    
+    def matches(session_id: str) -> bool:
+        return request.all or session_id in explicit or \
+            bool(request.pattern and fnmatch.fnmatchcase(session_id, request.pattern))
+    
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    subscriptions: Dict[str, Subscription] = {}
+    last_activity: Dict[str, float] = {}
     try:
-        vscode_check = subprocess.run(
-            "ps aux | grep 'code-server' | grep -v grep",
-            shell=True, capture_output=True, text=True
-        )
-        if vscode_check.returncode == 0 and vscode_check.stdout.strip():
-            services["vscode"] = {"status": "ok", "message": "VS Code server is running"}
-        else:
-            services["vscode"] = {"status": "error", "message": "VS Code server not detected"}
-            status = "partial"
+        watch = await tail_hub.watch(Subscription(CATALOG, queue))
     except Exception as e:
-        services["vscode"] = {"status": "error", "message": f"Failed to check VS Code: {str(e)}"}
-        status = "partial"
+        # e.g. the broker cannot be reached in multi-worker mode
+        print(f"Firehose error: {str(e)}")
+        yield f"event: error\ndata: {json.dumps({'error': f'Could not watch sessions: {str(e)}'})}\n\n"
+        return
+    
+    async def follow(session_id: str) -> Optional[Subscription]:
+        subscription = await tail_hub.subscribe(session_id, Subscription(session_id, queue))
+        if subscription is not None:
+            subscriptions[session_id] = subscription
+            last_activity[session_id] = time.time()
+        return subscription
     
-    # Check if tmux session exists
     try:
-        tmux_check = subprocess.run(
-            f"tmux has-session -t '{DEFAULT_SESSION}' 2>/dev/null",
-            shell=True, capture_output=True, text=True
-        )
-        if tmux_check.returncode == 0:
-            services["tmux"] = {"status": "ok", "message": f"Tmux session '{DEFAULT_SESSION}' is running"}
-        else:
-            services["tmux"] = {"status": "error", "message": f"Tmux session '{DEFAULT_SESSION}' not found"}
-            status = "partial"
+        now = time.time()
+        sessions = await io_pool.run(list_session_files, pool=io_pool.BULK)
+        for session_file in sessions:
+            session_id = session_file.session_id
+            if session_id in explicit or (
+                matches(session_id) and not session_file.archived and now - session_file.mtime <= request.active_within
+            ):
+                subscription = await follow(session_id)
+                if subscription is not None:
+                    yield f"event: subscribed\ndata: {json.dumps({'session_id': session_id, 'offset': subscription.offset})}\n\n"
+                    if session_id in resume_offsets:
+                        backlog = await io_pool.run(
+                            read_entries_since, session_id,
+                            min(resume_offsets[session_id], subscription.offset), subscription.offset
+                        )
+                        for tail_event in backlog:
+                            if tail_event.entry is not None:
+                                yield f"event: update\ndata: {json.dumps({'session_id': tail_event.session_id, 'offset': tail_event.offset, 'end': tail_event.end, 'entry': tail_event.entry})}\n\n"
+        
+        last_sweep = time.time()
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), 0.5)
+            except asyncio.TimeoutError:
+                event = None
+            
+            if isinstance(event, TailEvent):
+                last_activity[event.session_id] = time.time()
+                if event.entry is not None:
+                    yield f"event: update\ndata: {json.dumps({'session_id': event.session_id, 'offset': event.offset, 'end': event.end, 'entry': event.entry})}\n\n"
+            elif isinstance(event, CatalogEvent):
+                if event.kind == "created" and matches(event.session_id):
+                    yield f"event: session_created\ndata: {json.dumps({'session_id': event.session_id})}\n\n"
+                if matches(event.session_id) and event.session_id not in subscriptions:
+                    subscription = await follow(event.session_id)
+                    if subscription is None:
+                        continue
+                    yield f"event: subscribed\ndata: {json.dumps({'session_id': event.session_id, 'offset': subscription.offset})}\n\n"
+                    # Entries written between the watcher noticing the change and the subscription
+                    backlog = await io_pool.run(
+                        read_entries_since, event.session_id, event.previous_size, subscription.offset
+                    )
+                    for tail_event in backlog:
+                        if tail_event.entry is not None:
+                            yield f"event: update\ndata: {json.dumps({'session_id': tail_event.session_id, 'offset': tail_event.offset, 'end': tail_event.end, 'entry': tail_event.entry})}\n\n"
+            else:
+                closed = [s for s in list(subscriptions.values()) + [watch] if s.closed]
+                if closed:
+                    yield f"event: error\ndata: {json.dumps({'error': closed[0].error or 'Stream closed'})}\n\n"
+                    return
+                yield f"event: ping\ndata: {json.dumps({'timestamp': time.time()})}\n\n"
+            
+            # Stop following sessions matched by pattern that went idle
+            now = time.time()
+            if now - last_sweep > 10:
+                last_sweep = now
+                for session_id in [s for s in subscriptions if s not in explicit]:
+                    if now - last_activity.get(session_id, now) > request.active_within:
+                        tail_hub.unsubscribe(subscriptions.pop(session_id))
+                        last_activity.pop(session_id, None)
+                        yield f"event: session_idle\ndata: {json.dumps({'session_id': session_id})}\n\n"
     except Exception as e:
-        services["tmux"] = {"status": "error", "message": f"Failed to check tmux: {str(e)}"}
-        status = "partial"
+        error_msg = str(e)
+        print(f"Firehose error: {error_msg}")
+        yield f"event: error\ndata: {json.dumps({'error': error_msg})}\n\n"
+    finally:
+        for subscription in subscriptions.values():
+            tail_hub.unsubscribe(subscription)
+        tail_hub.unwatch(watch)
+
+@app.post("/api/stream/firehose", summary="Stream updates from many sessions using Server-Sent Events (SSE)", dependencies=[Depends(verify_api_key)])
+async def stream_firehose(request: FirehoseRequest, client: str = Depends(admission_key)):
+    """
+    Follow a set of sessions, a glob over session IDs, or all sessions on one connection.
+    
+    Events are tagged with their session_id. New session logs that match are announced
+    with `session_created` and followed automatically. The stream stays open until the
+    client disconnects.
+    """
+    if not (request.all or request.session_ids or request.pattern):
+        raise HTTPException(status_code=400, detail="Provide session_ids, pattern or all")
+    ticket = await admit("stream", client)
+    return admitted_stream(firehose_generator(request), ticket)
+
+@app.get("/api/stream/status", summary="Get the state of the shared tailers and the history cache", dependencies=[Depends(verify_api_key)])
+async def stream_status():
+    """
+    Get the number of tailed sessions and subscribers, the size and hit counters of
+    the history cache that serves the initial state of new streams, and the size and
+    backlog of the I/O thread pools.
+    """
+    return {"tail_hub": tail_hub.stats(), "history_cache": history_cache.stats(), "io_pools": io_pool.stats()}
+
+@app.get("/api/admission/status", summary="Get admission control limits and counters", dependencies=[Depends(verify_api_key)])
+async def admission_status():
+    """
+    Get the limits of each endpoint class (stream, command) and how many requests are
+    active, waiting for a slot, admitted, queued and rejected by rate or concurrency.
+    """
+    return admission.stats()
+
+# --- WebSocket Endpoint ---
+
+class WebSocketSession:
+    """
+    State of one WebSocket connection: its session subscriptions and the outbound queue.
+    
+    All messages go through a single sender task, so subscription forwarders and
+    request handlers never write to the socket concurrently.
+    """
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.outbound: asyncio.Queue = asyncio.Queue(maxsize=1000)
+        self.subscriptions: Dict[str, Any] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+    
+    async def send(self, message: Dict[str, Any]):
+        await self.outbound.put(json.dumps(message))
+    
+    async def sender(self):
+        while True:
+            await self.websocket.send_text(await self.outbound.get())
+    
+    async def subscribe(self, session_id: str, since: int = 0, request_id: Optional[str] = None):
+        """Follow a session, sending the history from `since` up to now followed by live updates."""
+        if session_id in self.subscriptions:
+            await self.send({"type": "subscribed", "id": request_id, "session_id": session_id,
+                             "offset": self.subscriptions[session_id].offset})
+            return
+        
+        try:
+            subscription = await tail_hub.subscribe(session_id)
+        except Exception as e:
+            # e.g. the broker cannot be reached in multi-worker mode
+            print(f"WebSocket error: {str(e)}")
+            await self.send({"type": "error", "id": request_id, "session_id": session_id,
+                             "error": f"Could not follow session {session_id}: {str(e)}"})
+            return
+        if subscription is None:
+            await self.send({"type": "error", "id": request_id, "session_id": session_id,
+                             "error": f"Session log file not found: {session_id}"})
+            return
+        self.subscriptions[session_id] = subscription
+        await self.send({"type": "subscribed", "id": request_id, "session_id": session_id, "offset": subscription.offset})
+        
+        # Only the part of the history the client does not have yet
+        if since < subscription.offset:
+            try:
+                entries = await io_pool.run(history_cache.entries, session_id, since, subscription.offset)
+            except Exception as e:
+                print(f"WebSocket error: {str(e)}")
+                self.unsubscribe(session_id)
+                await self.send({"type": "error", "id": request_id, "session_id": session_id,
+                                 "error": f"Error reading log file: {str(e)}"})
+                return
+            await self.send({"type": "history", "session_id": session_id, "since": since,
+                             "offset": subscription.offset, "entries": entries})
+        
+        self.tasks[session_id] = asyncio.create_task(self.forward(subscription))
+    
+    async def forward(self, subscription):
+        session_id = subscription.session_id
+        while True:
+            event = await subscription.next(timeout=30)
+            if event is None:
+                if subscription.closed:
+                    await self.send({"type": "error", "session_id": session_id, "error": subscription.error or "Subscription closed"})
+                    self.unsubscribe(session_id)
+                    return
+                continue
+            if event.entry is None:
+                continue
+            await self.send({"type": "update", "session_id": session_id, "offset": event.offset,
+                             "end": event.end, "entry": event.entry})
+            if is_assistant_text(event.entry):
+                await self.send({"type": "turn_complete", "session_id": session_id, "offset": event.end})
+    
+    def unsubscribe(self, session_id: str):
+        subscription = self.subscriptions.pop(session_id, None)
+        if subscription is not None:
+            tail_hub.unsubscribe(subscription)
+        task = self.tasks.pop(session_id, None)
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+    
+    async def prompt(self, message: Dict[str, Any], ticket: Ticket):
+        """Send a prompt to Goose and follow the session it lands in, releasing the command ticket once it is sent."""
+        request_id = message.get("id")
+        command = message.get("command")
+        session_id = message.get("session_id")
+        try:
+            if not command:
+                await self.send({"type": "error", "id": request_id, "error": "Missing command"})
+                return
+            await io_pool.run(
+                send_tmux_keys, command,
+                message.get("tmux_session", DEFAULT_SESSION), message.get("tmux_window", DEFAULT_WINDOW)
+            )
+        except Exception as e:
+            await self.send({"type": "error", "id": request_id, "error": f"Failed to send command: {str(e)}"})
+            return
+        finally:
+            ticket.release()
+        await self.send({"type": "ack", "id": request_id, "status": "sent"})
+        
+        if not session_id:
+            session_id = await find_session_for_message(command)
+            if not session_id:
+                await self.send({"type": "error", "id": request_id, "error": "Could not identify session ID for the command"})
+                return
+            await self.send({"type": "session_identified", "id": request_id, "session_id": session_id})
+        
+        if session_id not in self.subscriptions:
+            since = message.get("since", 0)
+            await self.subscribe(session_id, since if isinstance(since, int) and since >= 0 else 0, request_id)
+    
+    def close(self):
+        for session_id in list(self.subscriptions):
+            self.unsubscribe(session_id)
+        for task in self.tasks.values():
+            task.cancel()
+
+@app.websocket("/api/ws")
+async def websocket_session(websocket: WebSocket):
+    """
+    Bidirectional command-and-stream channel.
+    
+    Authenticate with the X-API-Key header. Clients that cannot set headers, such as
+    browsers, can use an `api_key` query parameter, which shows up in access logs. Messages
+    are JSON objects with a `type`; an optional `id` is echoed back in replies:
+    
+    - `{"type": "prompt", "command": "...", "session_id": "..."}` sends a prompt, replies
+      with `ack`, `session_identified` (when no session_id is given) and follows the session
+    - `{"type": "subscribe", "session_id": "...", "since": 0}` follows a session, sending the
+      `history` from byte offset `since` and then `update` events
+    - `{"type": "unsubscribe", "session_id": "..."}` stops following a session
+    - `{"type": "ping"}` replies with `pong`
+    
+    `turn_complete` is sent whenever the assistant replies with text, the connection
+    stays open for the next prompt.
+    """
+    # Closing before the handshake is accepted reaches the client as a plain HTTP 403,
+    # accept first so it gets the close code that tells auth and admission failures apart
+    await websocket.accept()
+    api_key = websocket.headers.get("x-api-key") or websocket.query_params.get("api_key")
+    if api_key != API_PASSWORD:
+        await websocket.close(code=4401 if not api_key else 4403)
+        return
+    
+    client = f"{api_key}:{client_id(websocket)}"
+    # The whole connection counts as one stream
+    try:
+        ticket = await admission.acquire("stream", client)
+    except Rejected as e:
+        await websocket.close(code=1013, reason=e.reason)
+        return
+    
+    connection = WebSocketSession(websocket)
+    sender = asyncio.create_task(connection.sender())
+    pending: set = set()
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except json.JSONDecodeError:
+                await connection.send({"type": "error", "error": "Messages must be JSON objects"})
+                continue
+            if not isinstance(message, dict):
+                await connection.send({"type": "error", "error": "Messages must be JSON objects"})
+                continue
+            
+            message_type = message.get("type")
+            request_id = message.get("id")
+            if message_type == "prompt":
+                try:
+                    command_ticket = await admission.acquire("command", client)
+                except Rejected as e:
+                    await connection.send({"type": "error", "id": request_id, "error": e.reason,
+                                           "retry_after": e.retry_after})
+                    continue
+                # Session identification can take a while, keep accepting messages meanwhile
+                task = asyncio.create_task(connection.prompt(message, command_ticket))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            elif message_type == "subscribe" and message.get("session_id"):
+                since = message.get("since", 0)
+                if not isinstance(since, int) or since < 0:
+                    await connection.send({"type": "error", "id": request_id, "error": "since must be a non-negative byte offset"})
+                    continue
+                await connection.subscribe(str(message["session_id"]), since, request_id)
+            elif message_type == "unsubscribe" and message.get("session_id"):
+                connection.unsubscribe(str(message["session_id"]))
+                await connection.send({"type": "unsubscribed", "id": request_id, "session_id": message["session_id"]})
+            elif message_type == "ping":
+                await connection.send({"type": "pong", "id": request_id, "timestamp": time.time()})
+            else:
+                await connection.send({"type": "error", "id": request_id, "error": f"Unknown message type: {message_type}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in pending:
+            task.cancel()
+        connection.close()
+        sender.cancel()
+        ticket.release()
+
+# --- Health Check Endpoint ---
+
+async def health_loop():
+    """Keep the cached health state fresh."""
+    while True:
+        try:
+            await io_pool.run(health_prober.probe)
+        except Exception as e:
+            print(f"Health probe error: {str(e)}")
+        await asyncio.sleep(health_prober.interval)
+
+def start_health_prober():
+    asyncio.create_task(health_loop())
+
+@app.get("/api/ping", summary="Health check endpoint", dependencies=[Depends(verify_api_key)])
+async def ping(deep: bool = False):
+    """
+    Health check endpoint that reports whether:
+    1. The API itself is running
+    2. The VS Code server is accessible
+    3. The tmux session has been started
+    
+    Parameters:
+    - deep: Run the checks now instead of returning the cached result
+    
+    The checks run in the background every few seconds, so this normally returns
+    the last result straight from memory. `age_seconds` tells how old it is.
+    
+    Returns a JSON response with detailed status information.
+    """
+    if deep or health_prober.result is None:
+        await io_pool.run(health_prober.probe)
     
     return {
-        "status": status,
+        "status": health_prober.result["status"],
         "message": "Goose Terminal API health check",
         "version": app.version,
-        "services": services
+        "services": health_prober.result["services"],
+        "checked_at": health_prober.checked_at,
+        "age_seconds": round(health_prober.age(), 3)
     }
 
 # --- Terminal Endpoints ---
 
 @app.post("/api/terminal/send", summary="Send a command to the tmux terminal", dependencies=[Depends(verify_api_key)])
-async def send_terminal_input(command_data: TerminalCommand):
+async def send_terminal_input(command_data: TerminalCommand, client: str = Depends(admission_key)):
     """
     Send a command to the specified tmux session and window.
     
     The command will be executed in the shared terminal as if typed directly.
+    Requests over the command limits get a 429 response with a Retry-After header.
     """
+    ticket = await admit("command", client)
     try:
         # Escape single quotes in the command
         escaped_command = command_data.command.replace("'", "'\\''")
         
         # Construct and execute the tmux command
         tmux_cmd = f"tmux send-keys -t '{command_data.session}:{command_data.window}' '{escaped_command}' C-m"
-        result = subprocess.run(tmux_cmd, shell=True, capture_output=True, text=True)
+        result = await io_pool.run(lambda: subprocess.run(tmux_cmd, shell=True, capture_output=True, text=True))
         
         if result.returncode != 0:
             raise HTTPException(status_code=500, detail=f"Failed to send command: {result.stderr}")
@@ -386,6 +1003,8 @@ async def send_terminal_input(command_data: TerminalCommand):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        ticket.release()
 
 @app.get("/api/terminal/sessions", summary="List all tmux sessions", dependencies=[Depends(verify_api_key)])
 async def list_tmux_sessions():
@@ -395,10 +1014,10 @@ async def list_tmux_sessions():
     Returns information about session names and creation times.
     """
     try:
-        result = subprocess.run(
+        result = await io_pool.run(lambda: subprocess.run(
             "tmux list-sessions -F '#{session_name},#{session_created}'", 
             shell=True, capture_output=True, text=True
-        )
+        ))
         
         if result.returncode != 0:
             return {"sessions": []}
@@ -419,64 +1038,278 @@ async def list_tmux_sessions():
 
 # --- Logs Endpoints ---
 
+def render_json(content: Any) -> bytes:
+    """Serialize a response body exactly like FastAPI would, so it can be shared between requests."""
+    return JSONResponse(jsonable_encoder(content)).body
+
+def session_list_version() -> Tuple[int, int, int]:
+    """
+    Version of the data a session listing is built from: the logs and archive
+    directories change when sessions are created, archived or removed, and the
+    index changes with every refresh that picked up appended entries.
+    """
+    versions = []
+    for path in (LOGS_PATH, ARCHIVE_PATH):
+        try:
+            versions.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            versions.append(0)
+    return versions[0], versions[1], session_index.version()
+
+def build_session_list(summary: bool) -> bytes:
+    summaries = session_index.summaries() if summary else {}
+    
+    sessions = []
+    for session_file in list_session_files():
+        session_summary = summaries.get(session_file.session_id, {})
+        sessions.append(SessionInfo(
+            session_id=session_file.session_id,
+            file_path=session_file.path,
+            size_bytes=session_file.size,
+            last_modified=session_file.mtime,
+            archived=session_file.archived,
+            stored_bytes=session_file.stored_bytes,
+            message_count=session_summary.get("message_count"),
+            tool_calls=session_summary.get("tool_calls"),
+            first_timestamp=session_summary.get("first_timestamp"),
+            last_timestamp=session_summary.get("last_timestamp"),
+            output_bytes=session_summary.get("output_bytes")
+        ))
+    
+    return render_json(sessions)
+
 @app.get("/api/sessions", response_model=List[SessionInfo], summary="List all session log files", dependencies=[Depends(verify_api_key)])
-async def list_sessions():
+async def list_sessions(summary: bool = False):
     """
     List all available Goose session log files.
     
-    Returns a list of session IDs along with file information.
+    Parameters:
+    - summary: Also include message count, tool call counts, timestamps and output size
+      from the summary cache (may lag behind the newest entries by a few seconds)
+    
+    Returns a list of session IDs along with file information. Concurrent identical
+    requests for the same version of the session catalog share one listing.
     """
     try:
-        sessions = []
-        for file_path in glob.glob(f"{LOGS_PATH}/*.jsonl"):
-            file_name = os.path.basename(file_path)
-            session_id = file_name.split('.')[0]
-            stats = os.stat(file_path)
-            
-            sessions.append(SessionInfo(
-                session_id=session_id,
-                file_path=file_path,
-                size_bytes=stats.st_size,
-                last_modified=stats.st_mtime
-            ))
+        # The version in the key keeps a request that comes after a change from joining an older listing
+        version = await io_pool.run(session_list_version)
+        body = await read_flights.do(
+            ("sessions", summary, version),
+            lambda: io_pool.run(build_session_list, summary, pool=io_pool.BULK)
+        )
+        return Response(content=body, media_type="application/json")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def build_session_log(session_id: str, format: str, log_filter: LogFilter) -> bytes:
+    try:
+        content = session_store.read(session_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Session log {session_id} not found")
+        
+    try:
+        if format != "raw" and log_filter.active:
+            entries = [LogEntry(data=entry) for entry in log_filter.filter_lines(content)]
+            return render_json(SessionLog(session_id=session_id, entries=entries))
         
-        return sessions
+        text = content.decode("utf-8", errors="replace")
+        if format == "raw":
+            return render_json({"raw_content": text})
+        else:
+            entries = []
+            for line in io.StringIO(text):
+                try:
+                    entry_data = json.loads(line)
+                    entries.append(LogEntry(data=entry_data))
+                except json.JSONDecodeError:
+                    entries.append(LogEntry(data={}, raw=line.strip()))
+                    
+            return render_json(SessionLog(session_id=session_id, entries=entries))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/sessions/{session_id}", summary="Get contents of a specific session log", dependencies=[Depends(verify_api_key)])
-async def get_session_log(session_id: str, format: str = "json"):
+async def get_session_log(session_id: str, format: str = "json", roles: Optional[str] = None,
+                          content_types: Optional[str] = None, fields: Optional[str] = None,
+                          audience: Optional[str] = None, truncate: Optional[int] = None):
     """
     Get the contents of a specific session log file.
     
     Parameters:
     - session_id: The ID of the session to retrieve
     - format: Response format ('json' or 'raw')
+    - roles: Comma separated roles to keep, e.g. 'user,assistant' ('metadata' keeps the session description)
+    - content_types: Comma separated content types to keep: text, toolRequest, toolResponse
+    - fields: Comma separated top-level message fields to keep, e.g. 'role,content'
+    - audience: Keep only tool output parts meant for this audience, e.g. 'user'
+    - truncate: Cut tool output text to this many bytes
+    
+    Returns the complete conversation log for the requested session. Archived
+    sessions are decompressed transparently. The filters only apply to the json
+    format; filtered responses leave out lines that are not valid JSON. Concurrent
+    identical requests for the same version of the log share one read.
+    """
+    try:
+        log_filter = LogFilter(split_list(roles), split_list(content_types), split_list(fields), audience, truncate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    session_file = await io_pool.run(session_store.stat, session_id)
+    if session_file is None:
+        raise HTTPException(status_code=404, detail=f"Session log {session_id} not found")
+    
+    # The size and mtime in the key keep a request that saw a newer log from joining an older read
+    key = ("log", session_id, session_file.size, session_file.mtime, format, roles, content_types, fields, audience, truncate)
+    body = await read_flights.do(
+        key,
+        lambda: io_pool.run(build_session_log, session_id, format, log_filter, pool=io_pool.BULK)
+    )
+    return Response(content=body, media_type="application/json")
+
+def read_appended_entries(session_id: str, since: int, end: Optional[int] = None,
+                          limit: Optional[int] = None) -> Tuple[List[TailEvent], int]:
+    """
+    Read the complete lines of a log starting at byte offset `since`.
+    
+    The log is read in blocks, so with a `limit` only as much of it is read as is
+    needed to collect that many entries.
+    
+    Returns:
+        The parsed entries (invalid JSON lines are skipped) and the offset just past
+        the last line that was consumed.
+    """
+    events = []
+    offset = since
+    position = since
+    # Blocks read since the last complete line
+    pending: List[bytes] = []
+    while end is None or position < end:
+        size = CHUNK_SIZE if end is None else min(CHUNK_SIZE, end - position)
+        block = session_store.read(session_id, position, position + size)
+        if not block:
+            break
+        position += len(block)
+        pending.append(block)
+        if b"\n" not in block:
+            continue
+        lines = b"".join(pending).split(b"\n")
+        pending = [lines.pop()]
+        for raw in lines:
+            if limit is not None and len(events) >= limit:
+                return events, offset
+            line_end = offset + len(raw) + 1
+            if raw.strip():
+                line = raw.decode("utf-8", errors="replace")
+                entry = parse_line(line)
+                if entry is not None:
+                    events.append(TailEvent(session_id, offset, line_end, line, entry))
+            offset = line_end
+        if limit is not None and len(events) >= limit:
+            break
+        if len(block) < size:
+            # Reached the end of the log
+            break
+    return events, offset
+
+@app.get("/api/sessions/{session_id}/changes", response_model=SessionChanges, summary="Long-poll for entries appended to a session", dependencies=[Depends(verify_api_key)])
+async def get_session_changes(session_id: str, since: int = 0, wait: float = 0, limit: int = 1000,
+                              client: str = Depends(admission_key)):
+    """
+    Get the entries appended to a session log after a byte offset, waiting for new ones if there are none yet.
+    
+    Parameters:
+    - since: Byte offset to start from, 0 for the whole log or the `next_offset` of the previous response
+    - wait: Seconds to hold the request when there are no new entries (0-60)
+    - limit: Maximum number of entries to return (1-10000)
     
-    Returns the complete conversation log for the requested session.
+    Returns the new entries and the offset to continue from. When the wait expires
+    without new entries, `entries` is empty and `next_offset` is unchanged. Waiting
+    requests are subject to the poll admission limits.
     """
-    log_path = f"{LOGS_PATH}/{session_id}.jsonl"
+    if not 0 <= wait <= 60:
+        raise HTTPException(status_code=400, detail="wait must be between 0 and 60 seconds")
+    if not 1 <= limit <= 10000:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 10000")
     
-    if not os.path.exists(log_path):
+    loop = asyncio.get_running_loop()
+    session_file = await io_pool.run(session_store.stat, session_id)
+    if session_file is None:
         raise HTTPException(status_code=404, detail=f"Session log {session_id} not found")
+    if not 0 <= since <= session_file.size:
+        raise HTTPException(status_code=400, detail=f"since must be between 0 and the log size ({session_file.size})")
+    
+    try:
+        events, next_offset = await io_pool.run(read_appended_entries, session_id, since, None, limit)
         
+        if not events and wait > 0:
+            ticket = await admit("poll", client)
+            subscription = await tail_hub.subscribe(session_id)
+            if subscription is None:
+                ticket.release()
+                raise HTTPException(status_code=404, detail=f"Session log {session_id} not found")
+            try:
+                # Entries written between the read above and the subscription
+                if subscription.offset > next_offset:
+                    events, next_offset = await io_pool.run(
+                        read_appended_entries, session_id, next_offset, subscription.offset, limit
+                    )
+                deadline = loop.time() + wait
+                while not events and not subscription.closed:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    event = await subscription.next(timeout=remaining)
+                    # Take everything that arrived together
+                    while event is not None:
+                        if event.offset >= next_offset:
+                            next_offset = event.end
+                            if event.entry is not None:
+                                events.append(event)
+                        if len(events) >= limit:
+                            break
+                        event = subscription.next_nowait()
+            finally:
+                tail_hub.unsubscribe(subscription)
+                ticket.release()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return SessionChanges(
+        session_id=session_id,
+        since=since,
+        next_offset=next_offset,
+        entries=[ChangedEntry(offset=e.offset, end=e.end, entry=e.entry) for e in events]
+    )
+
+@app.get("/api/sessions/{session_id}/stats", response_model=SessionStats, summary="Get analytics for a specific session", dependencies=[Depends(verify_api_key)])
+async def get_session_stats(session_id: str):
+    """
+    Get the message count, tool call counts per tool, first and last timestamps,
+    turn durations and total output size of a session.
+    
+    Served from the persistent summary cache, which is brought up to date with
+    any appended entries before answering.
+    """
+    
     try:
-        if format == "raw":
-            with open(log_path, 'r') as f:
-                return {"raw_content": f.read()}
-        else:
-            entries = []
-            with open(log_path, 'r') as f:
-                for line in f:
-                    try:
-                        entry_data = json.loads(line)
-                        entries.append(LogEntry(data=entry_data))
-                    except json.JSONDecodeError:
-                        entries.append(LogEntry(data={}, raw=line.strip()))
-                        
-            return SessionLog(session_id=session_id, entries=entries)
+        found = await io_pool.run(session_index.refresh_session, session_id, pool=io_pool.BULK)
+        session_file = await io_pool.run(session_store.stat, session_id)
+        if not found or session_file is None:
+            raise HTTPException(status_code=404, detail=f"Session log {session_id} not found")
+        session_summary = await io_pool.run(session_index.summary, session_id)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    
+    return SessionStats(
+        session_id=session_id,
+        size_bytes=session_file.size,
+        last_modified=session_file.mtime,
+        **session_summary
+    )
 
 @app.get("/api/sessions/latest/id", summary="Get the ID of the most recent session", dependencies=[Depends(verify_api_key)])
 async def get_latest_session_id():
@@ -486,24 +1319,433 @@ async def get_latest_session_id():
     Useful for quickly accessing the current active session.
     """
     try:
-        latest_file = None
+        latest_session = None
         latest_mtime = 0
         
-        for file_path in glob.glob(f"{LOGS_PATH}/*.jsonl"):
-            stats = os.stat(file_path)
-            if stats.st_mtime > latest_mtime:
-                latest_mtime = stats.st_mtime
-                latest_file = file_path
+        for session_file in await io_pool.run(list_session_files, pool=io_pool.BULK):
+            if session_file.mtime > latest_mtime:
+                latest_mtime = session_file.mtime
+                latest_session = session_file.session_id
                 
-        if latest_file:
-            session_id = os.path.basename(latest_file).split('.')[0]
-            return {"session_id": session_id}
+        if latest_session:
+            return {"session_id": latest_session, "last_modified": latest_mtime}
         else:
             raise HTTPException(status_code=404, detail="No session logs found")
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/sessions/{session_id}/restore", summary="Restore an archived session", dependencies=[Depends(verify_api_key)])
+async def restore_session(session_id: str):
+    """
+    Decompress an archived session back into the Goose sessions directory.
+    
+    Archived sessions can be read through the API as they are, restoring is only
+    needed before resuming the session in Goose itself. When Goose has started a
+    new log for the session since it was archived, the request fails with 409 and
+    both the live log and the archive are kept.
+    """
+    try:
+        restored = await io_pool.run(session_store.restore, session_id, pool=io_pool.BULK)
+    except RestoreConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not restored:
+        raise HTTPException(status_code=404, detail=f"Archived session {session_id} not found")
+    return {"success": True, "session_id": session_id}
+
+# --- Cold Storage ---
+
+async def archive_loop():
+    """Periodically archive idle sessions and enforce retention and size budget."""
+    while True:
+        try:
+            stats = await io_pool.run(
+                session_store.apply_policies,
+                ARCHIVE_AFTER_SECONDS, ARCHIVE_RETENTION_DAYS, int(ARCHIVE_BUDGET_MB * 1024 * 1024),
+                pool=io_pool.BULK
+            )
+            if any(stats.values()):
+                print(f"Cold storage: {stats}")
+        except Exception as e:
+            print(f"Cold storage error: {str(e)}")
+        await asyncio.sleep(ARCHIVE_INTERVAL)
+
+def start_archiver():
+    if ARCHIVE_AFTER_SECONDS > 0 or ARCHIVE_RETENTION_DAYS > 0 or ARCHIVE_BUDGET_MB > 0:
+        asyncio.create_task(archive_loop())
+
+# --- Search Endpoints ---
+
+async def index_refresh_loop():
+    """Keep the search index in sync with appended log data."""
+    while True:
+        try:
+            await io_pool.run(session_index.refresh, pool=io_pool.BULK)
+        except Exception as e:
+            print(f"Index refresh error: {str(e)}")
+        await asyncio.sleep(INDEX_REFRESH_INTERVAL)
+
+def start_index_refresh():
+    asyncio.create_task(index_refresh_loop())
+
+@app.get("/api/search", response_model=SearchResults, summary="Full-text search across all session logs", dependencies=[Depends(verify_api_key)])
+async def search_sessions(q: str, limit: int = 20, session_id: Optional[str] = None, role: Optional[str] = None):
+    """
+    Search message text, tool names and tool arguments of every session log.
+    
+    Parameters:
+    - q: Search terms, all of which must match (each term is matched as a phrase)
+    - limit: Maximum number of hits (1-200)
+    - session_id: Only search within this session
+    - role: Only return entries with this role ('user', 'assistant' or 'metadata')
+    
+    Returns hits ranked by relevance. The index is updated in the background from
+    appended log data, so very recent entries may take a moment to show up.
+    """
+    if not 1 <= limit <= 200:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+    
+    start_time = time.perf_counter()
+    try:
+        hits = await io_pool.run(session_index.search, q, limit, session_id, role, pool=io_pool.BULK)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return SearchResults(
+        query=q,
+        hits=[SearchHit(**hit) for hit in hits],
+        took_ms=round((time.perf_counter() - start_time) * 1000, 3)
+    )
+
+@app.get("/api/search/status", summary="Get search index status", dependencies=[Depends(verify_api_key)])
+async def search_status():
+    """
+    Get the number of indexed sessions, indexed bytes and the time of the last refresh.
+    """
+    try:
+        return await io_pool.run(session_index.stats)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/ready", summary="Readiness check for the session metadata", dependencies=[Depends(verify_api_key)])
+async def readiness():
+    """
+    Report whether the session metadata is warm: the persisted snapshot has been
+    reconciled with the logs directory since the API started.
+    
+    Returns 200 when ready and 503 while the first reconciliation is still running.
+    Every endpoint works before that, summaries and search may just lag behind.
+    """
+    try:
+        ready = await io_pool.run(session_index.ready)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "last_refresh": session_index.last_refresh}
+    )
+
+# --- Background Jobs ---
+
+def start_background_jobs():
+    """Start the jobs that must run exactly once per deployment."""
+    start_index_refresh()
+    start_archiver()
+
+async def warm_catalog():
+    """Load the persisted session catalog before the first request needs it."""
+    try:
+        await io_pool.run(session_index.catalog)
+    except Exception as e:
+        print(f"Session catalog unavailable: {str(e)}")
+
+@app.on_event("startup")
+async def on_startup():
+    # Every worker answers health checks from its own cached state
+    start_health_prober()
+    asyncio.create_task(warm_catalog())
+    # In multi-worker mode the broker process runs the background jobs
+    if not USE_BROKER:
+        start_background_jobs()
+
+async def broker_main():
+    start_background_jobs()
+    await broker.serve(BROKER_SOCKET, TailHub(session_store, TAIL_POLL_INTERVAL))
+
+def run_broker():
+    asyncio.run(broker_main())
+
+# --- Gateway Mode ---
+
+gateway_app = FastAPI(
+    title="Goose Terminal API Gateway",
+    description="Federates many Goose Terminal APIs: sessions, search and the latest session are merged across all backends, everything else is proxied to one backend under /api/backends/{backend}/. All endpoints require authentication using the X-API-Key header with the correct API key.",
+    version="0.1.0"
+)
+
+gateway_app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+class GatewaySessionInfo(SessionInfo):
+    """Model for a session of one of the gateway backends"""
+    backend: str
+
+class GatewaySearchHit(SearchHit):
+    """Model for a search hit from one of the gateway backends"""
+    backend: str
+
+class GatewaySearchResults(BaseModel):
+    """Model for search results merged across the gateway backends"""
+    query: str
+    hits: List[GatewaySearchHit]
+    took_ms: float
+    partial: bool  # Some backends did not answer
+    errors: Dict[str, str]  # Backend name -> why it did not answer
+
+# Proxied paths that count against admission control, relative to /api/
+PROXY_ADMISSION = {"stream": "stream", "stream/firehose": "stream", "terminal/send": "command"}
+
+def long_poll_wait(path: str, request: Request) -> float:
+    """Seconds a proxied request may wait on the backend before it answers, 0 if it is not a long-poll."""
+    if not fnmatch.fnmatchcase(path, "sessions/*/changes"):
+        return 0
+    try:
+        return max(0.0, float(request.query_params.get("wait", 0)))
+    except ValueError:
+        return 0
+
+def proxy_admission(path: str, request: Request) -> Optional[str]:
+    """The admission class of a proxied request, like the backend classifies it. None if it is not limited."""
+    if fnmatch.fnmatchcase(path, "sessions/*/changes"):
+        # Long-polls are only limited when they wait, as on the backends
+        return "poll" if long_poll_wait(path, request) > 0 else None
+    return PROXY_ADMISSION.get(path)
+
+PROXY_REQUEST_HEADERS = ("accept", "content-type", "last-event-id")
+PROXY_RESPONSE_HEADERS = ("cache-control", "content-type", "retry-after")
+
+def partial_error(e: PartialResults) -> HTTPException:
+    return HTTPException(status_code=502, detail={"message": str(e), "errors": e.errors})
+
+def failed_backends_header(errors: Dict[str, str]) -> Dict[str, str]:
+    """Name the backends missing from a merged list, which has no room for them in its body."""
+    return {"X-Gateway-Failed-Backends": ",".join(sorted(errors))} if errors else {}
+
+async def build_gateway_session_list(summary: bool) -> Tuple[bytes, Dict[str, str]]:
+    fan_out = await gateway.fan_out("/api/sessions", {"summary": summary})
+    sessions = [
+        GatewaySessionInfo(backend=name, **session)
+        for name, listing in fan_out.results.items() if listing
+        for session in listing
+    ]
+    sessions.sort(key=lambda session: session.last_modified, reverse=True)
+    return render_json(sessions), fan_out.errors
+
+@gateway_app.get("/api/sessions", response_model=List[GatewaySessionInfo], summary="List the sessions of all backends", dependencies=[Depends(verify_api_key)])
+async def gateway_list_sessions(summary: bool = False):
+    """
+    List the sessions of every backend, most recently modified first.
+    
+    Parameters:
+    - summary: Also include message count, tool call counts, timestamps and output size
+    
+    Each session names its backend, read it through /api/backends/{backend}/sessions/{session_id}.
+    Backends that did not answer are listed in the X-Gateway-Failed-Backends header.
+    Concurrent identical requests share one fan-out.
+    """
+    try:
+        body, errors = await read_flights.do(("gateway-sessions", summary), lambda: build_gateway_session_list(summary))
+    except PartialResults as e:
+        raise partial_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=body, media_type="application/json", headers=failed_backends_header(errors))
+
+@gateway_app.get("/api/search", response_model=GatewaySearchResults, summary="Full-text search across all backends", dependencies=[Depends(verify_api_key)])
+async def gateway_search(q: str, limit: int = 20, session_id: Optional[str] = None, role: Optional[str] = None):
+    """
+    Search the session logs of every backend.
+    
+    Parameters:
+    - q: Search terms, all of which must match (each term is matched as a phrase)
+    - limit: Maximum number of hits (1-200)
+    - session_id: Only search within sessions with this ID
+    - role: Only return entries with this role ('user', 'assistant' or 'metadata')
+    
+    Returns the best hits of all backends ranked by their score. Scores are computed
+    per backend, so the ranking across backends is approximate.
+    """
+    if not 1 <= limit <= 200:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+    
+    start_time = time.perf_counter()
+    params = {"q": q, "limit": limit}
+    if session_id is not None:
+        params["session_id"] = session_id
+    if role is not None:
+        params["role"] = role
+    try:
+        fan_out = await gateway.fan_out("/api/search", params)
+    except PartialResults as e:
+        raise partial_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    hits = [
+        GatewaySearchHit(backend=name, **hit)
+        for name, results in fan_out.results.items() if results
+        for hit in results["hits"]
+    ]
+    hits.sort(key=lambda hit: hit.score, reverse=True)
+    return GatewaySearchResults(
+        query=q,
+        hits=hits[:limit],
+        took_ms=round((time.perf_counter() - start_time) * 1000, 3),
+        partial=bool(fan_out.errors),
+        errors=fan_out.errors
+    )
+
+@gateway_app.get("/api/sessions/latest/id", summary="Get the most recent session of all backends", dependencies=[Depends(verify_api_key)])
+async def gateway_latest_session_id():
+    """
+    Get the ID and backend of the most recently modified session across all backends.
+    """
+    try:
+        fan_out = await gateway.fan_out("/api/sessions/latest/id")
+    except PartialResults as e:
+        raise partial_error(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    latest = None
+    for name, result in fan_out.results.items():
+        if result is None:
+            continue
+        candidate = {"session_id": result["session_id"], "backend": name, "last_modified": result.get("last_modified", 0)}
+        if latest is None or candidate["last_modified"] > latest["last_modified"]:
+            latest = candidate
+    if latest is None:
+        raise HTTPException(status_code=404, detail="No session logs found", headers=failed_backends_header(fan_out.errors))
+    return JSONResponse(content={**latest, "partial": bool(fan_out.errors)}, headers=failed_backends_header(fan_out.errors))
+
+@gateway_app.get("/api/ping", summary="Health check of the gateway and its backends", dependencies=[Depends(verify_api_key)])
+async def gateway_ping():
+    """
+    Check that the gateway is running and get the health of every backend.
+    
+    The status is "ok" when every backend reports "ok", and "partial" otherwise.
+    """
+    fan_out = await gateway.fan_out("/api/ping", strict=False)
+    backends = {name: {"status": "error", "message": error} for name, error in fan_out.errors.items()}
+    for name, result in fan_out.results.items():
+        if result is None:
+            backends[name] = {"status": "error", "message": "Not a goose-api backend"}
+        else:
+            backends[name] = {"status": result.get("status", "error"), "message": result.get("message", "")}
+    status = "ok" if all(backend["status"] == "ok" for backend in backends.values()) else "partial"
+    return {
+        "status": status,
+        "message": "Goose Terminal API Gateway is running",
+        "version": "0.1.0",
+        "backends": backends
+    }
+
+@gateway_app.get("/api/gateway/status", summary="Get the state of every gateway backend", dependencies=[Depends(verify_api_key)])
+async def gateway_status():
+    """
+    Get the URL, availability, last latency and error, and request counters of every backend.
+    """
+    return {
+        "timeout_seconds": GATEWAY_TIMEOUT,
+        "partial_results": GATEWAY_PARTIAL,
+        "backends": gateway.stats(),
+        "admission": admission.stats(),
+    }
+
+@gateway_app.api_route("/api/backends/{backend}/{path:path}", methods=["GET", "POST", "DELETE"], summary="Proxy a request to one backend", dependencies=[Depends(verify_api_key)])
+async def gateway_proxy(backend: str, path: str, request: Request, client: str = Depends(admission_key)):
+    """
+    Forward a request to one backend: /api/backends/{backend}/{path} is /api/{path} on that backend.
+    
+    The response is passed on as the backend sends it, so this also proxies streams
+    such as POST /api/backends/{backend}/stream. Streams, waiting long-polls and
+    commands are subject to the gateway's own admission control.
+    """
+    if not gateway.has(backend):
+        raise HTTPException(status_code=404, detail=f"Backend {backend} not found")
+    
+    endpoint = proxy_admission(path, request)
+    ticket = await admit(endpoint, client) if endpoint else None
+    headers = {name: value for name, value in request.headers.items() if name in PROXY_REQUEST_HEADERS}
+    # Let the backend apply its limits per client rather than to the gateway as a whole
+    headers["x-client-id"] = client_id(request)
+    try:
+        # A long-poll only sends its headers once the wait is over
+        response = await gateway.proxy(
+            backend, request.method, f"/api/{path}", request.query_params, headers, await request.body(),
+            header_timeout=GATEWAY_TIMEOUT + long_poll_wait(path, request)
+        )
+    except BackendError as e:
+        if ticket is not None:
+            ticket.release()
+        raise HTTPException(status_code=502, detail=f"Backend {backend} did not answer: {str(e)}")
+    except Exception as e:
+        if ticket is not None:
+            ticket.release()
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def close():
+        if ticket is not None:
+            ticket.release()
+        await response.aclose()
+    
+    async def body():
+        try:
+            async for chunk in response.aiter_bytes():
+                yield chunk
+        finally:
+            await close()
+    
+    return StreamingResponse(
+        body(),
+        status_code=response.status_code,
+        headers={name: value for name, value in response.headers.items() if name in PROXY_RESPONSE_HEADERS},
+        # Also covers a client that disconnects before the body is streamed
+        background=BackgroundTask(close)
+    )
+
+@gateway_app.on_event("startup")
+async def on_gateway_startup():
+    if gateway is None:
+        raise RuntimeError("Gateway mode needs GOOSE_API_GATEWAY_BACKENDS")
+    print(f"Gateway for {len(gateway.backends)} backends: {', '.join(b.name for b in gateway.backends)}")
+
+@gateway_app.on_event("shutdown")
+async def on_gateway_shutdown():
+    await gateway.close()
+
 # Start the API server
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    if GATEWAY_BACKENDS:
+        # A gateway keeps no local state, so its workers need no broker
+        uvicorn.run("main:gateway_app", host="0.0.0.0", port=PORT, workers=WORKERS)
+    elif WORKERS > 1:
+        import multiprocessing
+        
+        broker_process = multiprocessing.Process(target=run_broker, name="goose-api-broker", daemon=True)
+        broker_process.start()
+        # Workers are spawned as fresh interpreters and pick this up when importing main
+        os.environ["GOOSE_API_USE_BROKER"] = "1"
+        uvicorn.run("main:app", host="0.0.0.0", port=PORT, workers=WORKERS, ws_per_message_deflate=True)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=PORT, ws_per_message_deflate=True) 
\ No newline at end of file
@@ -0,0 +1,693 @@
+"""
+Persistent, incrementally maintained index and summaries of Goose session logs.
+
+The index lives in a SQLite database next to (but outside of) the logs
+directory. For every session file we remember how many bytes have already
+been indexed, so a refresh only reads and parses the bytes that were appended
+since the previous pass. Message text, tool names and tool arguments are
+stored in an FTS5 table which provides the inverted index and BM25 ranking.
+The same pass keeps a per-session summary (message and tool call counts,
+timestamps, turn durations, output size) that is resumed on the next pass.
+
+The files table doubles as a persisted snapshot of the session catalog. After
+a restart it is used to list sessions without reading every archive's index,
+and only files whose size or mtime changed are reconciled. Hashes of user
+messages let the API find the session a prompt landed in with one lookup.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from session_store import SessionFile, SessionStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    session_id TEXT PRIMARY KEY,
+    indexed_bytes INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    line_count INTEGER NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0,
+    stored_bytes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS user_messages (
+    hash TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS user_messages_hash ON user_messages (hash);
+CREATE INDEX IF NOT EXISTS user_messages_session ON user_messages (session_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS summaries (
+    session_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(
+    session_id UNINDEXED,
+    offset UNINDEXED,
+    line UNINDEXED,
+    role UNINDEXED,
+    text,
+    tools,
+    arguments
+);
+"""
+
+# Relative BM25 weights for the text, tools and arguments columns
+COLUMN_WEIGHTS = (1.0, 4.0, 0.5)
+# Bumped when indexed data gains new content, databases of older versions are re-indexed
+SCHEMA_VERSION = 1
+# A refresh commits and releases the write lock after this many seconds of work, so
+# single-session refreshes and other processes sharing the database are not held up
+REFRESH_BATCH_SECONDS = 0.2
+# How long a single-session refresh waits for the write lock before the indexed state is used as is
+REFRESH_SESSION_WAIT = 1.0
+
+
+def message_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def user_texts(entry: Any) -> List[str]:
+    """The text items of a user message, as typed by the user."""
+    message = entry_message(entry)
+    content = message.get("content")
+    if message.get("role") != "user" or not isinstance(content, list):
+        return []
+    texts = []
+    for item in content:
+        if not isinstance(item, dict):
+            continue
+        if item.get("type") == "text" and isinstance(item.get("text"), str):
+            texts.append(item["text"])
+        elif isinstance(item.get("Text"), dict) and isinstance(item["Text"].get("text"), str):
+            texts.append(item["Text"]["text"])
+    return texts
+
+
+def entry_message(entry: Any) -> Dict[str, Any]:
+    """Return the message dict of a log entry, unwrapping the optional 'data' field."""
+    if not isinstance(entry, dict):
+        return {}
+    data = entry.get("data")
+    if isinstance(data, dict):
+        return data
+    return entry
+
+
+def extract_searchable(entry: Any) -> Tuple[str, str, str, str]:
+    """
+    Split a log entry into the fields that are searchable.
+
+    Returns:
+        A (role, text, tools, arguments) tuple. The metadata line at the top of a
+        session file is reported with the role 'metadata'.
+    """
+    message = entry_message(entry)
+    role = message.get("role")
+    texts: List[str] = []
+    tools: List[str] = []
+    arguments: List[str] = []
+
+    if not role:
+        description = message.get("description")
+        if isinstance(description, str):
+            texts.append(description)
+        return "metadata", " ".join(texts), "", ""
+
+    content = message.get("content")
+    if isinstance(content, str):
+        texts.append(content)
+    elif isinstance(content, list):
+        for item in content:
+            if not isinstance(item, dict):
+                continue
+            if item.get("type") == "text" and isinstance(item.get("text"), str):
+                texts.append(item["text"])
+            elif isinstance(item.get("Text"), dict) and isinstance(item["Text"].get("text"), str):
+                texts.append(item["Text"]["text"])
+            elif item.get("type") == "toolRequest":
+                tool_data = (item.get("toolCall") or {}).get("value") or {}
+                if tool_data.get("name"):
+                    tools.append(str(tool_data["name"]))
+                if tool_data.get("arguments"):
+                    arguments.append(json.dumps(tool_data["arguments"], ensure_ascii=False))
+            elif item.get("type") == "toolResponse":
+                result = (item.get("toolResult") or {}).get("value")
+                if isinstance(result, list):
+                    for part in result:
+                        if isinstance(part, dict) and isinstance(part.get("text"), str):
+                            texts.append(part["text"])
+
+    return str(role), "\n".join(texts), " ".join(tools), "\n".join(arguments)
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free-form user input into a safe FTS5 MATCH expression.
+
+    Every whitespace separated term is quoted, so punctuation such as file
+    names or dotted tool names is matched as a phrase instead of being parsed
+    as FTS5 syntax. Terms are combined with an implicit AND.
+    """
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+
+class SessionSummary:
+    """
+    Running analytics for one session, fed one log entry at a time.
+
+    A turn starts with a user message that carries text (tool responses are
+    sent with the user role too, they do not start a turn) and lasts until the
+    last assistant message before the next turn starts.
+    """
+
+    def __init__(self):
+        self.message_count = 0
+        self.user_messages = 0
+        self.assistant_messages = 0
+        self.tool_calls: Dict[str, int] = {}
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+        self.turn_durations: List[float] = []
+        self.output_bytes = 0
+        # Start of the open turn and the latest assistant reply within it
+        self._turn_start: Optional[float] = None
+        self._turn_end: Optional[float] = None
+
+    def add(self, entry: Any):
+        message = entry_message(entry)
+        role = message.get("role")
+        if not role:
+            return
+
+        self.message_count += 1
+        created = message.get("created")
+        if isinstance(created, (int, float)):
+            if self.first_timestamp is None:
+                self.first_timestamp = created
+            self.last_timestamp = created
+
+        content = message.get("content")
+        items = content if isinstance(content, list) else []
+        has_text = isinstance(content, str) or any(
+            isinstance(item, dict) and (item.get("type") == "text" or "Text" in item) for item in items
+        )
+
+        if role == "user":
+            self.user_messages += 1
+            if has_text:
+                self._close_turn()
+                self._turn_start = created if isinstance(created, (int, float)) else None
+        elif role == "assistant":
+            self.assistant_messages += 1
+            if isinstance(created, (int, float)):
+                self._turn_end = created
+
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            if item.get("type") == "toolRequest":
+                name = ((item.get("toolCall") or {}).get("value") or {}).get("name") or "unknown"
+                self.tool_calls[name] = self.tool_calls.get(name, 0) + 1
+            elif item.get("type") == "toolResponse":
+                result = (item.get("toolResult") or {}).get("value")
+                if isinstance(result, list):
+                    for part in result:
+                        if isinstance(part, dict) and isinstance(part.get("text"), str):
+                            self.output_bytes += len(part["text"].encode("utf-8"))
+            elif role == "assistant" and item.get("type") == "text" and isinstance(item.get("text"), str):
+                self.output_bytes += len(item["text"].encode("utf-8"))
+
+    def _close_turn(self):
+        if self._turn_start is not None and self._turn_end is not None and self._turn_end >= self._turn_start:
+            self.turn_durations.append(self._turn_end - self._turn_start)
+        self._turn_start = None
+        self._turn_end = None
+
+    def to_state(self) -> Dict[str, Any]:
+        """Serializable state, including the open turn, so the summary can be resumed later."""
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SessionSummary":
+        summary = cls()
+        summary.__dict__.update(state)
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public view of the summary. A turn that is still open is counted once it has a reply."""
+        durations = list(self.turn_durations)
+        if self._turn_start is not None and self._turn_end is not None and self._turn_end >= self._turn_start:
+            durations.append(self._turn_end - self._turn_start)
+        return {
+            "message_count": self.message_count,
+            "user_messages": self.user_messages,
+            "assistant_messages": self.assistant_messages,
+            "tool_calls": dict(self.tool_calls),
+            "first_timestamp": self.first_timestamp,
+            "last_timestamp": self.last_timestamp,
+            "turn_durations": durations,
+            "output_bytes": self.output_bytes,
+        }
+
+
+class SessionIndex:
+    """
+    Inverted index over all session logs in a directory.
+
+    Call refresh() periodically (it is cheap when nothing changed) and search()
+    to query. Both are blocking and are meant to be run off the event loop.
+    """
+
+    def __init__(self, store: SessionStore, db_path: str):
+        self.store = store
+        self.db_path = db_path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        # session_id -> (indexed_bytes, size, mtime, line_count, archived, stored_bytes), mirrors the files table
+        self._files: Optional[Dict[str, Tuple[int, int, float, int, bool, int]]] = None
+        self.last_refresh: Optional[float] = None
+        self._started = time.time()
+        self._ready = False
+        # (data_version, sessions) of the last catalog() read
+        self._catalog: Optional[Tuple[int, Dict[str, SessionFile]]] = None
+        self._catalog_lock = threading.Lock()
+        self._catalog_conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, conn: sqlite3.Connection):
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            # Another process may have migrated while we waited for the lock
+            if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+                return
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(files)")}
+            if "archived" not in columns:
+                conn.execute("ALTER TABLE files ADD COLUMN archived INTEGER NOT NULL DEFAULT 0")
+            if "stored_bytes" not in columns:
+                conn.execute("ALTER TABLE files ADD COLUMN stored_bytes INTEGER NOT NULL DEFAULT 0")
+            # Index every session again so the new data gets filled in
+            for table in ("files", "summaries", "entries", "user_messages"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _load_files(self, conn: sqlite3.Connection) -> Dict[str, Tuple[int, int, float, int, bool, int]]:
+        if self._files is None:
+            # Files without a summary (indexed by an older version) are treated as new and re-indexed
+            self._files = {
+                row[0]: (row[1], row[2], row[3], row[4], bool(row[5]), row[6])
+                for row in conn.execute(
+                    "SELECT files.session_id, indexed_bytes, size, mtime, line_count, archived, stored_bytes "
+                    "FROM files JOIN summaries ON summaries.session_id = files.session_id"
+                )
+            }
+        return self._files
+
+    def _known_sessions(self, known: Dict[str, Tuple[int, int, float, int, bool, int]]) -> Dict[str, SessionFile]:
+        return {
+            session_id: SessionFile(
+                session_id,
+                self.store.archive_file(session_id) if archived else self.store.live_path(session_id),
+                size, mtime, archived, stored_bytes
+            )
+            for session_id, (_, size, mtime, _, archived, stored_bytes) in known.items()
+        }
+
+    def _catalog_connection(self) -> sqlite3.Connection:
+        # data_version is only comparable between calls on the same connection
+        if self._catalog_conn is None:
+            self._connect()
+            self._catalog_conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        return self._catalog_conn
+
+    def version(self) -> int:
+        """A number that changes whenever any process commits to the index, e.g. at the end of every refresh."""
+        with self._catalog_lock:
+            return self._catalog_connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def catalog(self) -> Dict[str, SessionFile]:
+        """
+        Get the sessions as of the last refresh, from any process, keyed by session ID.
+
+        Pass it to SessionStore.list() so unchanged archives are not read again. The
+        result is cached until the database changes.
+        """
+        with self._catalog_lock:
+            conn = self._catalog_connection()
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._catalog is None or self._catalog[0] != version:
+                known = {
+                    row[0]: (0, row[1], row[2], 0, bool(row[3]), row[4])
+                    for row in conn.execute("SELECT session_id, size, mtime, archived, stored_bytes FROM files")
+                }
+                self._catalog = (version, self._known_sessions(known))
+            return self._catalog[1]
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Bring the index up to date with the logs directory.
+
+        Only bytes appended since the last refresh are read. Files that shrank
+        are re-indexed from scratch and files that disappeared are dropped.
+
+        Returns:
+            Counters describing the work that was done.
+        """
+        stats = {"files_scanned": 0, "files_updated": 0, "files_removed": 0, "entries_indexed": 0}
+        with self._write_lock:
+            conn = self._connect()
+            # Unchanged archives are taken from the snapshot instead of reading their index files
+            sessions = self.store.list(self._known_sessions(self._load_files(conn)))
+        seen = {session.session_id for session in sessions}
+
+        # The work is committed in short batches, the lock is free for others in between
+        pending = list(reversed(sessions))
+        while pending:
+            with self._write_lock:
+                known = self._load_files(conn)
+                deadline = time.monotonic() + REFRESH_BATCH_SECONDS
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    with conn:
+                        while pending and time.monotonic() < deadline:
+                            session = pending.pop()
+                            stats["files_scanned"] += 1
+                            added = self._refresh_file_safely(conn, known, session)
+                            if added is not None:
+                                stats["files_updated"] += 1
+                                stats["entries_indexed"] += added
+                except BaseException:
+                    # The transaction was rolled back, the cached rows may describe work that was undone
+                    self._files = None
+                    raise
+
+        with self._write_lock:
+            known = self._load_files(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                with conn:
+                    for session_id in [s for s in known if s not in seen]:
+                        # Created while this pass was running, it is listed by the next one
+                        if self.store.stat(session_id) is not None:
+                            continue
+                        conn.execute("DELETE FROM entries WHERE session_id = ?", (session_id,))
+                        conn.execute("DELETE FROM user_messages WHERE session_id = ?", (session_id,))
+                        conn.execute("DELETE FROM files WHERE session_id = ?", (session_id,))
+                        conn.execute("DELETE FROM summaries WHERE session_id = ?", (session_id,))
+                        del known[session_id]
+                        stats["files_removed"] += 1
+
+                    self.last_refresh = time.time()
+                    conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_refresh', ?)", (str(self.last_refresh),)
+                    )
+            except BaseException:
+                self._files = None
+                raise
+            self._ready = True
+        return stats
+
+    def ready(self) -> bool:
+        """
+        Whether the index has been reconciled with the logs since this process started.
+
+        The refresh may run in another process (the broker in multi-worker mode), so
+        the time of the last refresh is read from the database until it is.
+        """
+        if not self._ready:
+            row = self._connect().execute("SELECT value FROM meta WHERE key = 'last_refresh'").fetchone()
+            if row is not None and float(row[0]) >= self._started:
+                self.last_refresh = float(row[0])
+                self._ready = True
+        return self._ready
+
+    def refresh_session(self, session_id: str) -> bool:
+        """
+        Bring a single session up to date, e.g. right before reading its summary.
+
+        If the index is busy for longer than REFRESH_SESSION_WAIT, a session that is
+        already indexed is left as it is, so the caller answers from the indexed state.
+
+        Returns:
+            False if the session log does not exist, True otherwise.
+        """
+        if not self._write_lock.acquire(timeout=REFRESH_SESSION_WAIT):
+            if self.summary(session_id) is not None:
+                return self.store.stat(session_id) is not None
+            self._write_lock.acquire()
+        try:
+            conn = self._connect()
+            known = self._load_files(conn)
+            session = self.store.stat(session_id)
+            if session is None:
+                return False
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                with conn:
+                    self._refresh_file(conn, known, session)
+            except BaseException:
+                self._files = None
+                raise
+        finally:
+            self._write_lock.release()
+        return True
+
+    def _unchanged(self, conn: sqlite3.Connection, known: Dict[str, Tuple[int, int, float, int, bool, int]],
+                   session: SessionFile) -> bool:
+        """Whether a file is indexed up to its current size and mtime, recording where it is stored if so."""
+        previous = known.get(session.session_id)
+        if not previous or previous[1] != session.size or previous[2] != session.mtime:
+            return False
+        if (previous[4], previous[5]) != (session.archived, session.stored_bytes):
+            # Archived or restored, the content itself did not change
+            conn.execute(
+                "UPDATE files SET archived = ?, stored_bytes = ? WHERE session_id = ?",
+                (int(session.archived), session.stored_bytes, session.session_id),
+            )
+            known[session.session_id] = previous[:4] + (session.archived, session.stored_bytes)
+        return True
+
+    def _refresh_file_safely(self, conn: sqlite3.Connection,
+                             known: Dict[str, Tuple[int, int, float, int, bool, int]],
+                             session: SessionFile) -> Optional[int]:
+        """
+        Like _refresh_file, but a file that cannot be indexed is skipped instead of
+        failing the whole pass. Its changes are undone and it is retried next pass.
+        """
+        previous = known.get(session.session_id)
+        conn.execute("SAVEPOINT refresh_file")
+        try:
+            added = self._refresh_file(conn, known, session)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            conn.execute("ROLLBACK TO refresh_file")
+            conn.execute("RELEASE refresh_file")
+            if previous is None:
+                known.pop(session.session_id, None)
+            else:
+                known[session.session_id] = previous
+            print(f"Index error for session {session.session_id}: {str(e)}")
+            return None
+        conn.execute("RELEASE refresh_file")
+        return added
+
+    def _refresh_file(self, conn: sqlite3.Connection, known: Dict[str, Tuple[int, int, float, int, bool, int]],
+                      session: SessionFile) -> Optional[int]:
+        """Index whatever was appended to one file. Returns the number of entries added, None if unchanged."""
+        session_id = session.session_id
+        if self._unchanged(conn, known, session):
+            return None
+        # Another process sharing the database may have indexed the file since it was loaded
+        row = conn.execute(
+            "SELECT indexed_bytes, size, mtime, line_count, archived, stored_bytes FROM files WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is not None:
+            known[session_id] = (row[0], row[1], row[2], row[3], bool(row[4]), row[5])
+            if self._unchanged(conn, known, session):
+                return None
+        previous = known.get(session_id)
+
+        indexed_bytes, line_count = (previous[0], previous[3]) if previous else (0, 0)
+        summary = None
+        if indexed_bytes and session.size >= indexed_bytes:
+            summary = self._load_summary(conn, session_id)
+        if summary is None or session.size < indexed_bytes:
+            # New file, or it was rewritten with less content: start over
+            if previous:
+                # session_id is not indexed in the FTS table, only scan it when there can be rows
+                conn.execute("DELETE FROM entries WHERE session_id = ?", (session_id,))
+                conn.execute("DELETE FROM user_messages WHERE session_id = ?", (session_id,))
+            indexed_bytes, line_count = 0, 0
+            summary = SessionSummary()
+
+        indexed_bytes, line_count, added = self._index_appended(
+            conn, session_id, indexed_bytes, line_count, summary
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO files (session_id, indexed_bytes, size, mtime, line_count, archived, stored_bytes) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (session_id, indexed_bytes, session.size, session.mtime, line_count,
+             int(session.archived), session.stored_bytes),
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO summaries (session_id, state) VALUES (?, ?)",
+            (session_id, json.dumps(summary.to_state())),
+        )
+        known[session_id] = (indexed_bytes, session.size, session.mtime, line_count,
+                              session.archived, session.stored_bytes)
+        return added
+
+    def _index_appended(self, conn: sqlite3.Connection, session_id: str, start: int,
+                        line_count: int, summary: SessionSummary) -> Tuple[int, int, int]:
+        """Index the complete lines after byte offset `start`. Returns (new offset, line count, entries added)."""
+        chunk = self.store.read(session_id, start)
+
+        # Only consume complete lines, a partially written line is picked up next time
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return start, line_count, 0
+
+        rows = []
+        hashes = []
+        position = 0
+        while position < end:
+            newline = chunk.index(b"\n", position)
+            line = chunk[position:newline]
+            offset = start + position
+            position = newline + 1
+            line_number = line_count
+            line_count += 1
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            summary.add(entry)
+            hashes.extend((message_hash(text), session_id, offset) for text in user_texts(entry))
+            role, text, tools, arguments = extract_searchable(entry)
+            if text or tools or arguments:
+                rows.append((session_id, offset, line_number, role, text, tools, arguments))
+
+        conn.executemany(
+            "INSERT INTO entries (session_id, offset, line, role, text, tools, arguments) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.executemany("INSERT INTO user_messages (hash, session_id, offset) VALUES (?, ?, ?)", hashes)
+        return start + end, line_count, len(rows)
+
+    def _load_summary(self, conn: sqlite3.Connection, session_id: str) -> Optional[SessionSummary]:
+        row = conn.execute("SELECT state FROM summaries WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        return SessionSummary.from_state(json.loads(row[0]))
+
+    def summary(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get the summary of one session as stored in the index, None if it is not indexed."""
+        summary = self._load_summary(self._connect(), session_id)
+        return summary.to_dict() if summary else None
+
+    def summaries(self) -> Dict[str, Dict[str, Any]]:
+        """Get the summaries of all indexed sessions keyed by session ID."""
+        return {
+            row[0]: SessionSummary.from_state(json.loads(row[1])).to_dict()
+            for row in self._connect().execute("SELECT session_id, state FROM summaries")
+        }
+
+    def find_user_message(self, text: str, modified_since: float = 0) -> Optional[str]:
+        """
+        Find the session that contains a user message with exactly this text.
+
+        Args:
+            text: The message text
+            modified_since: Only consider sessions modified at or after this time
+
+        Returns:
+            The ID of the most recently modified matching session, None if there is none.
+        """
+        row = self._connect().execute(
+            "SELECT files.session_id FROM user_messages JOIN files ON files.session_id = user_messages.session_id "
+            "WHERE hash = ? AND files.mtime >= ? ORDER BY files.mtime DESC LIMIT 1",
+            (message_hash(text), modified_since),
+        ).fetchone()
+        return row[0] if row else None
+
+    def search(self, query: str, limit: int = 20, session_id: Optional[str] = None,
+               role: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Run a ranked full-text query.
+
+        Args:
+            query: Free-form search terms, all of which must match
+            limit: Maximum number of hits to return
+            session_id: Restrict the search to a single session
+            role: Restrict the search to entries with this role
+
+        Returns:
+            Hits ordered by relevance, each with session_id, byte offset, line number,
+            role, score and a highlighted snippet.
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        sql = (
+            "SELECT session_id, offset, line, role, bm25(entries, 0, 0, 0, 0, ?, ?, ?) AS score, "
+            "snippet(entries, -1, '[', ']', '...', 16) "
+            "FROM entries WHERE entries MATCH ?"
+        )
+        params: List[Any] = [*COLUMN_WEIGHTS, match]
+        if session_id:
+            sql += " AND session_id = ?"
+            params.append(session_id)
+        if role:
+            sql += " AND role = ?"
+            params.append(role)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        conn = self._connect()
+        return [
+            {
+                "session_id": row[0],
+                "offset": row[1],
+                "line": row[2],
+                "role": row[3],
+                # BM25 scores are negative in SQLite, flip them so higher is better
+                "score": -row[4],
+                "snippet": row[5],
+            }
+            for row in conn.execute(sql, params)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Summary of what is currently indexed."""
+        conn = self._connect()
+        files, indexed_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(indexed_bytes), 0) FROM files"
+        ).fetchone()
+        return {"sessions": files, "indexed_bytes": indexed_bytes, "last_refresh": self.last_refresh,
+                "ready": self.ready()}
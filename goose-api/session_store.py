@@ -0,0 +1,358 @@
+"""
+Access to Goose session logs, whether they are live or archived.
+
+Live sessions are the plain `.jsonl` files Goose writes to the logs directory.
+Sessions that have been idle for a while can be moved into the archive
+directory as seekable gzip files: the log is cut into chunks of whole lines,
+every chunk is written as an independent gzip member and a sidecar `.idx` file
+records where each chunk starts, both in the original log and in the archive.
+Reading a byte range of an archived log only decompresses the chunks that
+cover it, and byte offsets stay the same as in the original file.
+
+Every reader in the API goes through SessionStore, so archived sessions can
+be listed, read, searched and streamed like live ones.
+"""
+import bisect
+import gzip
+import json
+import os
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, NamedTuple, Optional
+
+ARCHIVE_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".jsonl.gz.idx"
+# Uncompressed size of one independently compressed chunk
+CHUNK_SIZE = 256 * 1024
+
+
+def scan_directory(path: str, suffix: str) -> Dict[str, os.stat_result]:
+    """
+    Stat every file ending in `suffix` in a directory, keyed by session ID.
+
+    The stat calls are made relative to an open handle on the directory, so
+    the path is resolved once per scan instead of once per file.
+    """
+    try:
+        dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    except (FileNotFoundError, NotADirectoryError):
+        return {}
+    results = {}
+    try:
+        with os.scandir(dir_fd) as entries:
+            names = [entry.name for entry in entries if entry.name.endswith(suffix)]
+        for name in names:
+            try:
+                results[name.split('.')[0]] = os.stat(name, dir_fd=dir_fd)
+            except FileNotFoundError:
+                continue
+    finally:
+        os.close(dir_fd)
+    return results
+
+
+class RestoreConflict(Exception):
+    """An archived session cannot be restored because a live log of the same session exists."""
+
+    def __init__(self, session_id: str):
+        super().__init__(f"Session {session_id} has both a live log and an archive, restoring would replace one of them")
+        self.session_id = session_id
+
+
+class SessionFile(NamedTuple):
+    """A session log as seen by readers. Size and mtime are those of the original log."""
+    session_id: str
+    path: str
+    size: int
+    mtime: float
+    archived: bool
+    stored_bytes: int
+
+
+class SessionStore:
+    """Lists and reads live and archived session logs."""
+
+    def __init__(self, logs_path: str, archive_path: str):
+        self.logs_path = logs_path
+        self.archive_path = archive_path
+        self._lock = threading.Lock()
+        # session_id -> (idx file mtime_ns, parsed index)
+        self._archive_indexes: Dict[str, Any] = {}
+
+    def live_path(self, session_id: str) -> str:
+        return os.path.join(self.logs_path, f"{session_id}.jsonl")
+
+    def archive_file(self, session_id: str) -> str:
+        return os.path.join(self.archive_path, f"{session_id}{ARCHIVE_SUFFIX}")
+
+    def _load_archive_index(self, session_id: str) -> Optional[Dict[str, Any]]:
+        idx_path = os.path.join(self.archive_path, f"{session_id}{INDEX_SUFFIX}")
+        try:
+            mtime_ns = os.stat(idx_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            cached = self._archive_indexes.get(session_id)
+            if cached and cached[0] == mtime_ns:
+                return cached[1]
+        with open(idx_path, 'r') as f:
+            index = json.load(f)
+        with self._lock:
+            self._archive_indexes[session_id] = (mtime_ns, index)
+        return index
+
+    def list(self, known: Optional[Dict[str, SessionFile]] = None) -> List[SessionFile]:
+        """
+        List all sessions. A live log shadows an archive of the same session.
+
+        Args:
+            known: Sessions from an earlier listing, e.g. a persisted snapshot. Archives whose
+                file size and mtime did not change are taken from it without reading their index.
+        """
+        sessions: Dict[str, SessionFile] = {}
+        known = known or {}
+
+        for session_id, st in scan_directory(self.archive_path, ARCHIVE_SUFFIX).items():
+            previous = known.get(session_id)
+            # Archives carry the mtime of the original log, so an unchanged archive matches both
+            if previous is not None and previous.archived and \
+                    previous.stored_bytes == st.st_size and previous.mtime == st.st_mtime:
+                sessions[session_id] = previous
+                continue
+            try:
+                index = self._load_archive_index(session_id)
+            except (FileNotFoundError, ValueError):
+                continue
+            if index is None:
+                continue
+            sessions[session_id] = SessionFile(
+                session_id, self.archive_file(session_id), index["size"], index["mtime"], True, st.st_size
+            )
+
+        for session_id, st in scan_directory(self.logs_path, ".jsonl").items():
+            sessions[session_id] = SessionFile(
+                session_id, self.live_path(session_id), st.st_size, st.st_mtime, False, st.st_size
+            )
+
+        return list(sessions.values())
+
+    def stat(self, session_id: str) -> Optional[SessionFile]:
+        """Get the file information of one session, None if it does not exist."""
+        path = self.live_path(session_id)
+        try:
+            st = os.stat(path)
+            return SessionFile(session_id, path, st.st_size, st.st_mtime, False, st.st_size)
+        except FileNotFoundError:
+            pass
+        try:
+            index = self._load_archive_index(session_id)
+            if index is None:
+                return None
+            path = self.archive_file(session_id)
+            return SessionFile(session_id, path, index["size"], index["mtime"], True, os.stat(path).st_size)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def exists(self, session_id: str) -> bool:
+        return self.stat(session_id) is not None
+
+    def read(self, session_id: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """
+        Read the bytes [start, end) of a session log, decompressing archived logs as needed.
+
+        Raises:
+            FileNotFoundError: If the session does not exist
+        """
+        try:
+            with open(self.live_path(session_id), 'rb') as f:
+                f.seek(start)
+                return f.read() if end is None else f.read(max(0, end - start))
+        except FileNotFoundError:
+            pass
+
+        index = self._load_archive_index(session_id)
+        if index is None:
+            raise FileNotFoundError(f"Session log {session_id} not found")
+        size = index["size"]
+        end = size if end is None else min(end, size)
+        if start >= end:
+            return b""
+
+        chunks = index["chunks"]
+        first = bisect.bisect_right([chunk[0] for chunk in chunks], start) - 1
+        parts = []
+        with open(self.archive_file(session_id), 'rb') as f:
+            for raw_offset, stored_offset, stored_length in chunks[first:]:
+                if raw_offset >= end:
+                    break
+                f.seek(stored_offset)
+                data = zlib.decompress(f.read(stored_length), wbits=31)
+                parts.append(data[max(0, start - raw_offset):end - raw_offset])
+        return b"".join(parts)
+
+    # --- Archiving ---
+
+    def archive(self, session_id: str) -> bool:
+        """
+        Compress a live session log into the archive and remove the original.
+
+        The original is moved aside before the final check, so a writer that opens
+        the log by path afterwards creates a new live log instead of writing into
+        the one being archived. The original is put back if it changed while it was
+        being compressed. A write through a handle that was already open on the log
+        and lands between the check and the removal is still lost.
+
+        Returns:
+            True if the session was archived.
+        """
+        path = self.live_path(session_id)
+        try:
+            st = os.stat(path)
+            with open(path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return False
+
+        os.makedirs(self.archive_path, exist_ok=True)
+        archive_file = self.archive_file(session_id)
+        idx_file = os.path.join(self.archive_path, f"{session_id}{INDEX_SUFFIX}")
+        tmp_archive = archive_file + ".tmp"
+        tmp_idx = idx_file + ".tmp"
+
+        chunks = []
+        stored_offset = 0
+        with open(tmp_archive, 'wb') as out:
+            raw_offset = 0
+            while raw_offset < len(content):
+                chunk_end = raw_offset + CHUNK_SIZE
+                if chunk_end < len(content):
+                    # Keep chunks aligned to whole lines
+                    newline = content.find(b"\n", chunk_end)
+                    chunk_end = len(content) if newline == -1 else newline + 1
+                else:
+                    chunk_end = len(content)
+                member = gzip.compress(content[raw_offset:chunk_end], mtime=0)
+                out.write(member)
+                chunks.append([raw_offset, stored_offset, len(member)])
+                stored_offset += len(member)
+                raw_offset = chunk_end
+            out.flush()
+            os.fsync(out.fileno())
+
+        with open(tmp_idx, 'w') as out:
+            json.dump({"size": len(content), "mtime": st.st_mtime, "chunks": chunks}, out)
+            out.flush()
+            os.fsync(out.fileno())
+
+        aside = path + ".archiving"
+        try:
+            os.rename(path, aside)
+        except FileNotFoundError:
+            os.unlink(tmp_archive)
+            os.unlink(tmp_idx)
+            return False
+        current = os.stat(aside)
+        if current.st_size != st.st_size or current.st_mtime != st.st_mtime:
+            os.unlink(tmp_archive)
+            os.unlink(tmp_idx)
+            self._put_back(aside, path)
+            return False
+
+        os.replace(tmp_archive, archive_file)
+        os.replace(tmp_idx, idx_file)
+        os.utime(archive_file, (st.st_atime, st.st_mtime))
+        os.unlink(aside)
+        return True
+
+    def _put_back(self, aside: str, path: str):
+        """Move a log that was moved aside back, unless a new log was created in its place."""
+        try:
+            # Unlike a rename, linking never replaces a log that was created in the meantime
+            os.link(aside, path)
+        except FileExistsError:
+            print(f"Session log {path} was recreated while it was archived, the previous log is kept at {aside}")
+            return
+        os.unlink(aside)
+
+    def restore(self, session_id: str) -> bool:
+        """
+        Decompress an archived session back into the logs directory, so Goose can resume it.
+
+        Returns:
+            True if the session was restored, False if it is not archived.
+
+        Raises:
+            RestoreConflict: If a live log exists as well, both are kept
+        """
+        index = self._load_archive_index(session_id)
+        if index is None:
+            return False
+        path = self.live_path(session_id)
+        if os.path.exists(path):
+            raise RestoreConflict(session_id)
+
+        content = self.read(session_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as out:
+            out.write(content)
+            out.flush()
+            os.fsync(out.fileno())
+        # The restored log keeps the current mtime, so it is not archived again right away.
+        # Unlike a rename, linking fails instead of replacing a log created in the meantime
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            raise RestoreConflict(session_id)
+        finally:
+            os.unlink(tmp_path)
+        self.delete_archive(session_id)
+        return True
+
+    def delete_archive(self, session_id: str):
+        for suffix in (INDEX_SUFFIX, ARCHIVE_SUFFIX):
+            try:
+                os.unlink(os.path.join(self.archive_path, f"{session_id}{suffix}"))
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._archive_indexes.pop(session_id, None)
+
+    def apply_policies(self, archive_after: float, retention_days: float, budget_bytes: int) -> Dict[str, int]:
+        """
+        Run one pass of the cold storage policies.
+
+        Args:
+            archive_after: Archive live sessions idle for this many seconds (0 disables archiving)
+            retention_days: Delete archived sessions older than this many days (0 keeps them forever)
+            budget_bytes: Delete the oldest archived sessions while the archive exceeds this size (0 is unlimited)
+
+        Returns:
+            Counters describing the work that was done.
+        """
+        stats = {"archived": 0, "expired": 0, "evicted": 0}
+        now = time.time()
+
+        if archive_after > 0:
+            for session in self.list():
+                if not session.archived and now - session.mtime > archive_after:
+                    if self.archive(session.session_id):
+                        stats["archived"] += 1
+
+        archived = sorted((s for s in self.list() if s.archived), key=lambda s: s.mtime)
+        if retention_days > 0:
+            cutoff = now - retention_days * 86400
+            for session in [s for s in archived if s.mtime < cutoff]:
+                self.delete_archive(session.session_id)
+                archived.remove(session)
+                stats["expired"] += 1
+
+        if budget_bytes > 0:
+            total = sum(s.stored_bytes for s in archived)
+            while archived and total > budget_bytes:
+                session = archived.pop(0)
+                self.delete_archive(session.session_id)
+                total -= session.stored_bytes
+                stats["evicted"] += 1
+
+        return stats
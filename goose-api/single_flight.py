@@ -0,0 +1,48 @@
+"""
+Coalescing of concurrent identical requests.
+
+When many clients ask for the same thing at the same moment, for example every
+dashboard reloading the session list after an outage, only the first request
+does the work. Requests with the same key that arrive while it is in flight
+wait for it and receive the same result instead of repeating the reads and the
+serialization. Nothing is kept once the flight has landed, so keys should
+include the version of the data they depend on (such as a log's size and
+mtime) to keep a later request from joining an older read.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Runs at most one computation per key at a time and shares its result."""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+        self._counters = {"started": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Get the result of compute(), sharing it with concurrent callers that use the same key.
+
+        Exceptions are raised to every caller of the flight. A caller that is
+        cancelled does not cancel the flight for the others.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(compute())
+            self._flights[key] = flight
+            flight.add_done_callback(lambda done: self._land(key, done))
+            self._counters["started"] += 1
+        else:
+            self._counters["coalesced"] += 1
+        return await asyncio.shield(flight)
+
+    def _land(self, key: Hashable, flight: asyncio.Future):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the exception as retrieved in case every caller went away
+        if not flight.cancelled():
+            flight.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._flights), **self._counters}
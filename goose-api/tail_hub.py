@@ -0,0 +1,260 @@
+"""
+Shared tailing of session logs.
+
+Instead of every stream polling and re-reading a log on its own, a TailHub
+runs at most one tailer per session. The tailer reads only the complete lines
+appended since its last pass and fans the parsed entries out to all of the
+session's subscribers. The tailer stops as soon as its last subscriber leaves.
+
+The hub can also watch the logs directory itself and report sessions that are
+created or modified, for subscribers that follow many sessions at once.
+"""
+import asyncio
+import json
+from typing import Any, Dict, NamedTuple, Optional, Set, Tuple
+
+import io_pool
+from session_store import SessionStore, scan_directory
+
+# Entries a subscriber may fall behind before it is dropped
+SUBSCRIBER_QUEUE_SIZE = 10000
+
+
+class TailEvent(NamedTuple):
+    """A complete log line appended to a session, with its byte range in the log."""
+    session_id: str
+    offset: int
+    end: int
+    line: str
+    entry: Any  # Parsed JSON, None if the line is not valid JSON
+
+
+class CatalogEvent(NamedTuple):
+    """A session log that was created or grew, as seen by the directory watcher."""
+    kind: str  # 'created' or 'modified'
+    session_id: str
+    previous_size: int
+    size: int
+
+
+# Session ID used by subscriptions to the directory watcher
+CATALOG = "*"
+
+
+def parse_line(line: str) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError:
+        return None
+
+
+class Subscription:
+    """
+    A subscriber's view of one session.
+
+    `offset` is the position in the log from which events are delivered, so
+    everything before it can be read from the log directly without gaps or
+    duplicates. Several subscriptions can share one queue to follow many
+    sessions with a single reader.
+    """
+
+    def __init__(self, session_id: str, queue: Optional[asyncio.Queue] = None):
+        self.session_id = session_id
+        self.offset = 0
+        self.closed = False
+        self.error: Optional[str] = None
+        self._queue: asyncio.Queue = queue if queue is not None else asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+
+    def deliver(self, event: Any):
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.close("Subscriber fell too far behind")
+
+    def close(self, error: Optional[str] = None):
+        if self.closed:
+            return
+        self.closed = True
+        self.error = error
+        # Wake up a pending next()
+        try:
+            self._queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def next(self, timeout: float) -> Any:
+        """
+        Wait for the next event.
+
+        Returns:
+            The event, or None if the timeout expired or the subscription was closed.
+        """
+        if self.closed and self._queue.empty():
+            return None
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def next_nowait(self) -> Any:
+        """Get the next event if one is already queued, None otherwise."""
+        try:
+            return self._queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return None
+
+
+class _Tailer:
+    def __init__(self, session_id: str, position: int):
+        self.session_id = session_id
+        self.position = position
+        self.subscribers: Set[Subscription] = set()
+        self.task: Optional[asyncio.Task] = None
+
+
+class TailHub:
+    """Runs one tailer per subscribed session and fans out appended entries."""
+
+    def __init__(self, store: SessionStore, poll_interval: float = 0.5):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._tailers: Dict[str, _Tailer] = {}
+        self._watchers: Set[Subscription] = set()
+        self._watch_task: Optional[asyncio.Task] = None
+
+    def _complete_end(self, session_id: str) -> Optional[int]:
+        """Offset just past the last complete line of a log, None if the session does not exist."""
+        session = self.store.stat(session_id)
+        if session is None:
+            return None
+        end = session.size
+        block = 64 * 1024
+        while end > 0:
+            start = max(0, end - block)
+            data = self.store.read(session_id, start, end)
+            newline = data.rfind(b"\n")
+            if newline != -1:
+                return start + newline + 1
+            end = start
+        return 0
+
+    async def subscribe(self, session_id: str, subscription: Optional[Subscription] = None) -> Optional[Subscription]:
+        """
+        Subscribe to the entries appended to a session from now on.
+
+        Args:
+            session_id: The session to follow
+            subscription: A Subscription (or subclass) to register, a new one is created if omitted
+
+        Returns:
+            The subscription with its start offset set, None if the session does not exist.
+        """
+        tailer = self._tailers.get(session_id)
+        if tailer is None:
+            position = await io_pool.run(self._complete_end, session_id)
+            if position is None:
+                return None
+            # Another subscriber may have started the tailer while we were reading
+            tailer = self._tailers.get(session_id)
+            if tailer is None:
+                tailer = _Tailer(session_id, position)
+                self._tailers[session_id] = tailer
+                tailer.task = asyncio.create_task(self._run(tailer))
+
+        subscription = subscription or Subscription(session_id)
+        subscription.offset = tailer.position
+        tailer.subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        tailer = self._tailers.get(subscription.session_id)
+        if tailer is None:
+            return
+        tailer.subscribers.discard(subscription)
+        if not tailer.subscribers:
+            del self._tailers[subscription.session_id]
+            if tailer.task:
+                tailer.task.cancel()
+
+    def _read_appended(self, session_id: str, position: int):
+        session = self.store.stat(session_id)
+        if session is None or session.size == position:
+            return position, b""
+        if session.size < position:
+            # The log was rewritten with less content, continue from its new end
+            return None, b""
+        data = self.store.read(session_id, position)
+        return position, data[:data.rfind(b"\n") + 1]
+
+    async def _run(self, tailer: _Tailer):
+        while tailer.subscribers:
+            try:
+                position, data = await io_pool.run(self._read_appended, tailer.session_id, tailer.position)
+                if position is None:
+                    tailer.position = await io_pool.run(self._complete_end, tailer.session_id) or 0
+                elif data:
+                    offset = position
+                    for raw in data.split(b"\n")[:-1]:
+                        end = offset + len(raw) + 1
+                        if raw.strip():
+                            line = raw.decode("utf-8", errors="replace")
+                            event = TailEvent(tailer.session_id, offset, end, line, parse_line(line))
+                            for subscription in list(tailer.subscribers):
+                                subscription.deliver(event)
+                        offset = end
+                    tailer.position = offset
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Tailer error for session {tailer.session_id}: {str(e)}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def watch(self, subscription: Optional[Subscription] = None) -> Subscription:
+        """Subscribe to CatalogEvents for live session logs that are created or grow from now on."""
+        subscription = subscription or Subscription(CATALOG)
+        self._watchers.add(subscription)
+        if self._watch_task is None:
+            self._watch_task = asyncio.create_task(self._run_watcher())
+        return subscription
+
+    def unwatch(self, subscription: Subscription):
+        self._watchers.discard(subscription)
+        if not self._watchers and self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    def _scan_logs(self) -> Dict[str, Tuple[int, float]]:
+        return {
+            session_id: (st.st_size, st.st_mtime)
+            for session_id, st in scan_directory(self.store.logs_path, ".jsonl").items()
+        }
+
+    async def _run_watcher(self):
+        known = await io_pool.run(self._scan_logs)
+        while self._watchers:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                current = await io_pool.run(self._scan_logs)
+            except Exception as e:
+                print(f"Session watcher error: {str(e)}")
+                continue
+            for session_id, (size, mtime) in current.items():
+                previous = known.get(session_id)
+                if previous is None:
+                    event = CatalogEvent("created", session_id, 0, size)
+                elif previous != (size, mtime):
+                    event = CatalogEvent("modified", session_id, previous[0], size)
+                else:
+                    continue
+                for subscription in list(self._watchers):
+                    subscription.deliver(event)
+            known = current
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tailers": len(self._tailers),
+            "subscribers": sum(len(t.subscribers) for t in self._tailers.values()),
+            "watchers": len(self._watchers),
+        }
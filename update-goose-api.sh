@@ -25,7 +25,7 @@ docker exec $CONTAINER_NAME bash -c "chmod +x /workspace/goose-api/docker-integr
 
 # Install dependencies using the virtual environment
 echo "Updating required packages in virtual environment..."
-docker exec $CONTAINER_NAME bash -c "export PATH=/opt/goose-api-venv/bin:\$PATH && cd /workspace/goose-api && pip install -r requirements.txt"
+docker exec $CONTAINER_NAME bash -c "export PATH=/opt/goose-api-venv/bin:\$PATH && cd /workspace/goose-api && pip install -r requirements.txt ./client"
 
 # Restart the API
 echo "Restarting the Goose API service..."